@@ -0,0 +1,73 @@
+# build_book.py
+"""
+Gera o livro de aberturas lido por choose_move (search.OpeningBook).
+
+Enumera todas as posições até --plies jogadas a partir do tabuleiro vazio,
+guardando uma só de cada par espelhado (a de menor chave), busca cada uma em
+profundidade fixa com search.choose_moves_batch e grava o arquivo binário
+ordenado por chave.
+
+Uso:
+    python build_book.py [--plies 4] [--depth 10] [--workers N] [--out book.bin]
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Tuple
+
+import search
+
+def enumerate_positions(plies: int) -> List[Tuple[List[List[int]], int]]:
+    """
+    Posições não terminais com até plies peças, uma por par espelhado, cada
+    uma na orientação de menor chave. Retorna [(tabuleiro, jogador da vez)].
+    """
+    level: Dict[int, List[List[int]]] = {0: [[search.EMPTY] * search.COLS
+                                               for _ in range(search.ROWS)]}
+    positions = []
+    for ply in range(plies + 1):
+        turn = search.P1 if ply % 2 == 0 else search.P2
+        next_level: Dict[int, List[List[int]]] = {}
+        for board in level.values():
+            if search.terminal(board)[0]:
+                continue
+            positions.append((board, turn))
+            if ply == plies:
+                continue
+            for col in search.valid_moves(board):
+                child = search.make_move(board, col, turn)
+                key, mirrored = search.Position.from_board(child).canonical_key()
+                if mirrored:
+                    child = search.mirror_board(child)
+                next_level.setdefault(key, child)
+        level = next_level
+    return positions
+
+def build(plies: int, depth: int, workers: int, out: str) -> None:
+    positions = enumerate_positions(plies)
+    print(f"{len(positions)} posições até {plies} jogadas, profundidade {depth}")
+    config = {'max_time_ms': 0, 'max_depth': depth, 'book': None,
+              'batch_workers': workers}
+    entries: Dict[int, Tuple[int, float]] = {}
+    start = time.time()
+    # Por número de peças: dá para acompanhar o progresso
+    by_ply: Dict[int, List[Tuple[List[List[int]], int]]] = {}
+    for board, turn in positions:
+        by_ply.setdefault(sum(v != search.EMPTY for row in board for v in row), []).append((board, turn))
+    for ply in sorted(by_ply):
+        group = by_ply[ply]
+        results = search.choose_moves_batch([b for b, _ in group], [t for _, t in group], config)
+        for (board, _), (col, info) in zip(group, results):
+            entries[search.Position.from_board(board).key()] = (col, info['score'])
+        print(f"  {ply} jogadas: {len(group)} posições ({time.time() - start:.0f} s)")
+    search.write_book(out, entries, depth)
+    print(f"{len(entries)} registros gravados em {out} ({os.path.getsize(out)} bytes)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o livro de aberturas")
+    parser.add_argument("--plies", type=int, default=4, help="jogadas a partir do tabuleiro vazio")
+    parser.add_argument("--depth", type=int, default=10, help="profundidade da busca de cada posição")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos")
+    parser.add_argument("--out", default=search.DEFAULT_BOOK_PATH, help="arquivo de saída")
+    args = parser.parse_args()
+    build(args.plies, args.depth, args.workers, args.out)
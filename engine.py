@@ -0,0 +1,316 @@
+# engine.py
+"""
+Processo de engine de longa duração usado pelo servidor.
+
+A busca roda fora do processo do Flask para isolar travamentos e loops
+infinitos. Em vez de criar um processo novo a cada /ai_move (pagando a partida
+do interpretador e o import de search.py), o EnginePool mantém workers
+pré-iniciados; cada EngineWorker guarda uma tabela de transposição por
+partida (game_id), então jogadas consecutivas da mesma partida começam com a
+tabela quente. Entre uma requisição e outra o processo pode ponderar (buscar
+a posição esperada depois da resposta do oponente): ver _engine_loop.
+
+Este módulo não importa Flask, para que o processo filho (spawn) carregue
+apenas search.py.
+"""
+import time
+import queue
+import threading
+from collections import OrderedDict
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional, Tuple
+
+import search
+
+class SessionTables:
+    """
+    Tabelas de transposição por partida, com despejo LRU.
+
+    Uma sessão é descartada quando fica ociosa por mais de idle_timeout_s, ou
+    quando abrir uma nova sessão ultrapassaria max_sessions ou o teto de
+    memory_mb (soma dos tamanhos das tabelas).
+    """
+
+    def __init__(self, max_sessions: int = 8, memory_mb: float = 256.0,
+                 idle_timeout_s: float = 600.0) -> None:
+        self.max_sessions = max_sessions
+        self.memory_mb = memory_mb
+        self.idle_timeout_s = idle_timeout_s
+        # game_id -> (tabela, tamanho em MB, último uso)
+        self._tables: "OrderedDict[str, Tuple[search.TranspositionTable, float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._tables
+
+    def used_mb(self) -> float:
+        return sum(size for _, size, _ in self._tables.values())
+
+    def get(self, game_id: str, tt_mb: float) -> search.TranspositionTable:
+        """Tabela da partida (criada se necessário), marcada como usada agora."""
+        now = time.time()
+        self._evict_idle(now)
+        if game_id in self._tables:
+            table, size, _ = self._tables.pop(game_id)
+        else:
+            size = min(tt_mb, self.memory_mb)
+            while self._tables and (len(self._tables) >= self.max_sessions or
+                                    self.used_mb() + size > self.memory_mb):
+                self._tables.popitem(last=False)  # menos recentemente usada
+            table = search.TranspositionTable(size)
+        self._tables[game_id] = (table, size, now)
+        return table
+
+    def _evict_idle(self, now: float) -> None:
+        for game_id in [g for g, (_, _, last) in self._tables.items()
+                        if now - last > self.idle_timeout_s]:
+            del self._tables[game_id]
+
+def _ponder_status(pondered: Optional[Dict], game_id: str, board, turn: int,
+                  config: Dict) -> str:
+    """"hit", "partial" ou "miss" para a jogada pedida em relação à ponderação."""
+    if pondered is None or pondered["game_id"] != game_id or \
+            pondered["board"] != board or pondered["turn"] != turn:
+        return "miss"
+    same_config = ({k: v for k, v in pondered["config"].items() if k != "max_time_ms"} ==
+                   {k: v for k, v in config.items() if k != "max_time_ms"})
+    return "hit" if same_config and pondered["complete"] else "partial"
+
+def _ponder(jobs, func: Callable, game_id: str, board, turn: int, config: Dict,
+            tt: search.TranspositionTable) -> Dict:
+    """
+    Busca a posição prevista sem limite de tempo até max_depth, parando assim
+    que chegar um novo job na fila.
+    """
+    col, stats = func(board, turn, dict(config, max_time_ms=0), tt=tt, verbose=False,
+                      stop=lambda: not jobs.empty())
+    return {"game_id": game_id, "board": board, "turn": turn, "config": config,
+            "col": col, "complete": stats.stop_reason == "max_depth",
+            "depth": stats.depth_reached, "stats": stats.to_dict()}
+
+def _engine_loop(jobs, results, max_sessions: int, memory_mb: float,
+                 idle_timeout_s: float) -> None:
+    """
+    Laço do processo filho: executa jogadas até receber None.
+
+    Com config["ponder"] e game_id, depois de responder o processo busca a
+    posição prevista para a próxima jogada da partida (a resposta esperada do
+    oponente, tirada da tabela) enquanto a fila estiver vazia. Se a próxima
+    jogada pedida for essa posição e a ponderação tiver chegado a max_depth, a
+    coluna sai sem nova busca (extra["ponder"] = "hit"); se não tiver chegado,
+    a busca começa com a tabela já quente ("partial"). Para ponderar, func
+    precisa aceitar verbose e stop e devolver (col, SearchStats), como
+    search.search_with_stats.
+
+    func pode devolver só a coluna (ou o que o chamador espera como payload)
+    ou (col, SearchStats); no segundo caso o payload é col e extra leva as
+    estatísticas em "stats".
+    """
+    tables = SessionTables(max_sessions, memory_mb, idle_timeout_s)
+    results.put(("ready", None, None, None))
+    pondered: Optional[Dict] = None
+    ponder_job = None
+    while True:
+        if ponder_job is not None:
+            try:
+                pondered = _ponder(jobs, *ponder_job)
+            except Exception:
+                pondered = None
+            ponder_job = None
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, func, board, turn, config, game_id = job
+        try:
+            tt = None
+            extra: Dict = {}
+            tt_mb = float(config.get("tt_mb", 16))
+            if game_id and tt_mb > 0:
+                extra["session_warm"] = game_id in tables
+                tt = tables.get(game_id, tt_mb)
+            ponder = bool(game_id and config.get("ponder") and tt is not None)
+            if ponder:
+                extra["ponder"] = _ponder_status(pondered, game_id, board, int(turn), config)
+            t0 = time.time()
+            if extra.get("ponder") == "hit":
+                col = pondered["col"]
+                extra["ponder_depth"] = pondered["depth"]
+                extra["stats"] = pondered["stats"]
+            else:
+                col = func(board, turn, config, tt=tt)
+                if isinstance(col, tuple) and isinstance(col[1], search.SearchStats):
+                    col, stats = col
+                    extra["stats"] = stats.to_dict()
+            extra["search_ms"] = int((time.time() - t0) * 1000)
+            results.put((job_id, "ok", col, extra))
+            pondered = None
+            if ponder:
+                # Prevê a resposta do oponente e pondera a posição seguinte
+                reply = search.predicted_reply(board, int(turn), col, tt)
+                if reply is not None:
+                    next_board = search.make_move(search.make_move(board, col, int(turn)),
+                                                  reply, search.other(int(turn)))
+                    if not search.terminal(next_board)[0]:
+                        ponder_job = (func, game_id, next_board, int(turn), config, tt)
+        except Exception as e:
+            results.put((job_id, "err", str(e), {}))
+
+class EngineWorker:
+    """
+    Processo de engine persistente com hard timeout.
+
+    run() envia uma jogada ao processo e espera até timeout_s. Se o processo
+    estourar o tempo ou morrer, ele é encerrado e recriado (perdendo as
+    tabelas) e o status correspondente é devolvido ao chamador.
+    """
+
+    def __init__(self, max_sessions: int = 8, memory_mb: float = 256.0,
+                 idle_timeout_s: float = 600.0) -> None:
+        self._args = (max_sessions, memory_mb, idle_timeout_s)
+        self._ctx = get_context("spawn")
+        self.lock = threading.Lock()
+        self._proc = None
+        self._jobs = None
+        self._results = None
+        self._next_id = 0
+        # Processos criados e tempo total até ficarem prontos (métricas)
+        self.spawns = 0
+        self.spawn_seconds = 0.0
+
+    def _start(self) -> None:
+        t0 = time.time()
+        self._jobs = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._proc = self._ctx.Process(target=_engine_loop,
+                                       args=(self._jobs, self._results) + self._args,
+                                       daemon=True)
+        self._proc.start()
+        # Espera o processo importar search.py: a partida do interpretador
+        # não deve consumir o orçamento de tempo da primeira jogada
+        self._results.get()
+        self.spawns += 1
+        self.spawn_seconds += time.time() - t0
+
+    def _kill(self) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.join()
+        self._proc = None
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def start(self) -> None:
+        """Sobe o processo (se ainda não estiver de pé)."""
+        with self.lock:
+            if not self.alive():
+                self._start()
+
+    def run(self, func: Callable, board: List[List[int]], turn, config: Dict,
+            game_id: Optional[str], timeout_s: float) -> Tuple[str, object, Dict]:
+        """
+        Executa func(board, turn, config, tt=...) no processo da engine.
+        Retorna (status, payload, extra) com status em
+        "ok" | "err" | "timeout" | "crash".
+        """
+        with self.lock:
+            return self.run_locked(func, board, turn, config, game_id, timeout_s)
+
+    def run_locked(self, func: Callable, board: List[List[int]], turn, config: Dict,
+                   game_id: Optional[str], timeout_s: float) -> Tuple[str, object, Dict]:
+        """Como run(), mas o chamador já deve ter adquirido self.lock."""
+        if not self.alive():
+            self._start()
+        self._next_id += 1
+        job_id = self._next_id
+        self._jobs.put((job_id, func, board, turn, config, game_id))
+
+        deadline = time.time() + timeout_s
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                # Estourou tempo: mata o processo
+                self._kill()
+                return "timeout", None, {}
+            try:
+                rid, status, payload, extra = self._results.get(timeout=min(remaining, 0.05))
+            except queue.Empty:
+                if not self._proc.is_alive():
+                    # Crash silencioso
+                    self._kill()
+                    return "crash", None, {}
+                continue
+            if rid == job_id:
+                return status, payload, extra
+
+    def close(self) -> None:
+        with self.lock:
+            if self.alive():
+                self._jobs.put(None)
+                self._proc.join(1.0)
+            self._kill()
+
+class EnginePool:
+    """
+    Conjunto de EngineWorker pré-iniciados.
+
+    Jogadas com game_id vão sempre para o mesmo worker (a tabela da partida
+    vive nele); jogadas sem game_id vão para o primeiro worker livre. Um
+    worker que estoura o tempo é morto e substituído em segundo plano.
+
+    O extra devolvido por run() separa a espera na fila (queue_wait_ms, tempo
+    aguardando um worker livre) do tempo de busca medido no worker (search_ms).
+    """
+
+    def __init__(self, size: int = 2, max_sessions: int = 8, memory_mb: float = 256.0,
+                 idle_timeout_s: float = 600.0) -> None:
+        # Orçamento de memória e sessões dividido entre os workers
+        per_worker_sessions = max(1, max_sessions // size)
+        per_worker_mb = memory_mb / size
+        self.workers = [EngineWorker(per_worker_sessions, per_worker_mb, idle_timeout_s)
+                        for _ in range(size)]
+        self._next = 0
+
+    def start(self) -> None:
+        """Sobe todos os processos em paralelo (antes da primeira requisição)."""
+        threads = [threading.Thread(target=w.start) for w in self.workers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def _acquire(self, game_id: Optional[str]) -> Tuple[int, EngineWorker]:
+        if game_id:
+            i = sum(game_id.encode()) % len(self.workers)
+            self.workers[i].lock.acquire()
+            return i, self.workers[i]
+        for i, w in enumerate(self.workers):
+            if w.lock.acquire(blocking=False):
+                return i, w
+        # Todos ocupados: espera o próximo da fila circular
+        i = self._next = (self._next + 1) % len(self.workers)
+        self.workers[i].lock.acquire()
+        return i, self.workers[i]
+
+    def run(self, func: Callable, board: List[List[int]], turn, config: Dict,
+            game_id: Optional[str], timeout_s: float) -> Tuple[str, object, Dict]:
+        """Mesmo contrato de EngineWorker.run()."""
+        t0 = time.time()
+        i, worker = self._acquire(game_id)
+        try:
+            queue_wait_ms = int((time.time() - t0) * 1000)
+            status, payload, extra = worker.run_locked(func, board, turn, config,
+                                                       game_id, timeout_s)
+        finally:
+            worker.lock.release()
+        if status in ("timeout", "crash"):
+            # Substitui o processo morto sem segurar a requisição atual
+            threading.Thread(target=worker.start, daemon=True).start()
+        extra = dict(extra, worker=i, queue_wait_ms=queue_wait_ms)
+        return status, payload, extra
+
+    def close(self) -> None:
+        for w in self.workers:
+            w.close()
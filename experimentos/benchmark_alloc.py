@@ -0,0 +1,183 @@
+"""
+Benchmark de alocações por nó: busca com tabuleiros copiados (make_move)
+versus busca incremental com play/undo sobre Position.
+
+Para cada posição de teste roda a Alfa-Beta nas duas versões, confere que os
+valores e o número de nós são idênticos e reporta listas alocadas por nó
+(contadas nos pontos de alocação) e tempo por nó.
+
+Uso:
+    python benchmark_alloc.py [profundidade]
+"""
+
+import time
+import random
+from typing import List, Dict, Tuple
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+from search import (
+    Position, make_move, terminal, valid_moves, order_moves, evaluate, other,
+    threat_moves, EMPTY, P1, P2, ROWS, COLS, H
+)
+
+class BoardBits:
+    """Bitboards de um tabuleiro em matriz: só o que threat_moves lê (bits)."""
+
+    __slots__ = ('bits',)
+
+    def __init__(self, board: List[List[int]]) -> None:
+        bits = {P1: 0, P2: 0}
+        for r in range(ROWS):
+            for c in range(COLS):
+                p = board[r][c]
+                if p != EMPTY:
+                    bits[p] |= 1 << (c * H + ROWS - 1 - r)
+        self.bits = bits
+
+def alphabeta_lists(board: List[List[int]], depth: int, max_depth: int, player: int,
+                    is_maximizing: bool, alpha: float, beta: float, stats: Dict) -> float:
+    """
+    Versão de referência (antiga): um tabuleiro novo por filho via make_move,
+    com os mesmos cortes de ameaça (threat_moves) da busca incremental, para
+    que as duas visitem a mesma árvore.
+    """
+    stats['nodes_visited'] = stats.get('nodes_visited', 0) + 1
+    is_terminal, winner_player = terminal(board)
+    if is_terminal:
+        if winner_player == player:
+            return float('inf')
+        elif winner_player == other(player):
+            return float('-inf')
+        return 0.0
+    if depth >= max_depth:
+        if is_maximizing:
+            return evaluate(board, player)
+        return -evaluate(board, other(player))
+    legal_moves = valid_moves(board)
+    if not legal_moves:
+        return 0.0
+    ordered_moves = order_moves(board, legal_moves, player)
+    mover = player if is_maximizing else other(player)
+    status, ordered_moves = threat_moves(BoardBits(board), mover, ordered_moves,
+                                         max_depth - depth)
+    if status != 0:
+        mover_wins = status == 1
+        return float('inf') if mover_wins == is_maximizing else float('-inf')
+    best = float('-inf') if is_maximizing else float('inf')
+    for col in ordered_moves:
+        new_board = make_move(board, col, mover)
+        value = alphabeta_lists(new_board, depth + 1, max_depth, player,
+                                not is_maximizing, alpha, beta, stats)
+        if is_maximizing:
+            best = max(best, value)
+            alpha = max(alpha, best)
+        else:
+            best = min(best, value)
+            beta = min(beta, best)
+        if beta <= alpha:
+            stats['pruned'] = stats.get('pruned', 0) + 1
+            break
+    return best
+
+class AllocationCounter:
+    """
+    Conta listas alocadas pela busca, instrumentando os pontos de alocação
+    (cópia de tabuleiro, geração e ordenação de jogadas). A heurística de
+    folha é idêntica nas duas versões e fica de fora da contagem.
+    """
+
+    def __init__(self) -> None:
+        self.lists = 0
+        self._saved = []
+
+    def __enter__(self) -> "AllocationCounter":
+        counter = self
+
+        def wrap(owner, name, lists_per_call):
+            original = getattr(owner, name)
+            self._saved.append((owner, name, original))
+
+            def wrapper(*args, **kwargs):
+                counter.lists += lists_per_call
+                return original(*args, **kwargs)
+            setattr(owner, name, wrapper)
+
+        # copy_board: 1 lista externa + 1 por linha
+        wrap(search, 'copy_board', 1 + ROWS)
+        wrap(search, 'valid_moves', 1)
+        # order_moves: sorted() + closure de chave
+        wrap(search, 'order_moves', 2)
+        wrap(Position, 'ordered_moves', 1)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for owner, name, original in reversed(self._saved):
+            setattr(owner, name, original)
+        self._saved.clear()
+
+def random_positions(n: int, seed: int = 0) -> List[Tuple[List[List[int]], int]]:
+    """Gera n posições não terminais por jogadas aleatórias (reprodutível)."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < n:
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+        turn = P1
+        for _ in range(rng.randint(0, 20)):
+            board = make_move(board, rng.choice(valid_moves(board)), turn)
+            turn = other(turn)
+            if terminal(board)[0]:
+                break
+        if not terminal(board)[0]:
+            positions.append((board, turn))
+    return positions
+
+def run_benchmark(max_depth: int = 5, num_positions: int = 10) -> Dict:
+    inf = float('inf')
+    results = {}
+    for name in ('make_move', 'play_undo'):
+        nodes = 0
+        lists = 0
+        elapsed = 0.0
+        values = []
+        for board, turn in random_positions(num_positions):
+            # Contagem de alocações (com instrumentação)
+            stats = {'nodes_visited': 0}
+            with AllocationCounter() as counter:
+                if name == 'make_move':
+                    alphabeta_lists(board, 0, max_depth, turn, True, -inf, inf, stats)
+                else:
+                    search.minimax_alphabeta(board, 0, max_depth, turn, True, -inf, inf, stats)
+            lists += counter.lists
+            # Tempo (sem instrumentação)
+            stats = {'nodes_visited': 0}
+            start = time.perf_counter()
+            if name == 'make_move':
+                value = alphabeta_lists(board, 0, max_depth, turn, True, -inf, inf, stats)
+            else:
+                value = search.minimax_alphabeta(board, 0, max_depth, turn, True, -inf, inf, stats)
+            elapsed += time.perf_counter() - start
+            nodes += stats['nodes_visited']
+            values.append(value)
+        results[name] = {
+            'nodes': nodes,
+            'lists_per_node': lists / nodes,
+            'us_per_node': elapsed / nodes * 1e6,
+            'values': values,
+        }
+    return results
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = run_benchmark(max_depth=depth)
+    before, after = results['make_move'], results['play_undo']
+    assert before['values'] == after['values'], "As duas buscas divergiram!"
+    assert before['nodes'] == after['nodes'], "Número de nós diferente!"
+
+    print(f"Alfa-Beta, profundidade {depth}, {before['nodes']} nós")
+    print(f"{'versão':<12} {'listas/nó':>10} {'µs/nó':>10}")
+    for name in ('make_move', 'play_undo'):
+        r = results[name]
+        print(f"{name:<12} {r['lists_per_node']:>10.2f} {r['us_per_node']:>10.1f}")
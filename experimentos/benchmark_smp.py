@@ -0,0 +1,64 @@
+"""
+Mede a busca paralela (config["smp_workers"]) num conjunto fixo de posições:
+tempo até completar a profundidade pedida, nós por processo e speedup em
+relação a um processo só.
+
+Os processos auxiliares são criados (e a tabela compartilhada é limpa) antes
+de cada medição, então o tempo de partida dos processos não entra na conta.
+
+Uso:
+    python benchmark_smp.py [profundidade] [num_posicoes] [workers...]
+    ex.: python benchmark_smp.py 9 10 1 2 4
+"""
+
+import io
+import time
+import contextlib
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+from benchmark_alloc import random_positions
+
+TT_MB = 16.0
+
+def run(max_depth: int, num_positions: int, workers: int):
+    """Retorna (tempo total, nós por processo, jogadas escolhidas)."""
+    # Sem livro: uma consulta ao livro não mede a busca
+    config = {'max_time_ms': 0, 'max_depth': max_depth, 'tt_mb': TT_MB,
+              'smp_workers': workers, 'book': None}
+    elapsed = 0.0
+    worker_nodes = [0] * workers
+    moves = []
+    for board, turn in random_positions(num_positions):
+        if workers > 1:
+            pool = search.smp_helpers(workers - 1, TT_MB)
+            pool.tt.clear()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            col, stats = search.search_with_stats(board, turn, config)
+        elapsed += time.perf_counter() - start
+        moves.append(col)
+        info = stats.details
+        for i, n in enumerate(info.get('worker_nodes', [info['nodes_visited']])):
+            worker_nodes[i] += n
+    return elapsed, worker_nodes, moves
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    counts = [int(a) for a in sys.argv[3:]] or [1, 2, 4]
+    print(f"Profundidade {depth}, {n} posições, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'tempo (s)':>10} {'speedup':>8} {'mesma jogada':>13}  nós por processo")
+    base_time, base_moves = None, None
+    for w in counts:
+        if w > 1:
+            # Sobe os auxiliares fora da medição
+            search.smp_helpers(w - 1, TT_MB)
+        elapsed, worker_nodes, moves = run(depth, n, w)
+        if base_time is None:
+            base_time, base_moves = elapsed, moves
+        same = sum(a == b for a, b in zip(moves, base_moves))
+        print(f"{w:>7} {elapsed:>10.2f} {base_time / elapsed:>8.2f} {same:>10}/{n}  {worker_nodes}")
+    search.close_smp_helpers()
@@ -0,0 +1,244 @@
+"""
+Benchmark determinístico: roda cada função de busca (minimax,
+minimax_alphabeta, choose_move) em profundidade fixa sobre um corpus
+versionado de posições (bench_corpus.json: abertura, meio-jogo, táticas e
+finais) e compara nós, tempo, nós por segundo e jogada escolhida com uma
+linha de base gravada (bench_baseline.json).
+
+Os nós não dependem da máquina: qualquer aumento acima do limite é uma
+regressão do algoritmo. O tempo (melhor de --repeat execuções, somado por
+função) varia com a máquina e a carga, então o limite padrão é mais folgado.
+Sai com código 1 se houver regressão.
+
+Uso:
+    python benchmark_suite.py                 # compara com a linha de base
+    python benchmark_suite.py --update        # grava uma nova linha de base
+    python benchmark_suite.py --make-corpus   # regera o corpus (nova versão)
+"""
+
+import io
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import contextlib
+from typing import Dict, List, Tuple
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+from search import P1, P2, ROWS, COLS, EMPTY, other
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_FILE = os.path.join(HERE, 'bench_corpus.json')
+BASELINE_FILE = os.path.join(HERE, 'bench_baseline.json')
+CORPUS_VERSION = 1
+
+# (nome, profundidade): profundidades fixas, escolhidas para o conjunto todo
+# rodar em segundos mesmo sem poda
+SEARCHES = [
+    ("minimax", 4),
+    ("minimax_alphabeta", 6),
+    ("choose_move", 8),
+]
+# choose_move com a configuração de produção, exceto o livro e o resolvedor
+# exato (uma consulta ao livro não mede a busca, e os finais do corpus
+# cairiam no resolvedor em vez da busca em profundidade fixa) e o limite de
+# tempo
+CHOOSE_MOVE_CONFIG = {'max_time_ms': 0, 'book': None, 'solver_empty': 0, 'tt_mb': 16}
+
+# Limites padrão de regressão (fração acima da linha de base)
+NODE_THRESHOLD = 0.02
+TIME_THRESHOLD = 0.25
+
+def board_to_str(board: List[List[int]]) -> str:
+    return ';'.join(''.join(str(v) for v in row) for row in board)
+
+def board_from_str(text: str) -> List[List[int]]:
+    return [[int(ch) for ch in row] for row in text.split(';')]
+
+# -----------------------------------------------------------------------------
+# Corpus
+# -----------------------------------------------------------------------------
+
+# Categoria -> (faixa de peças no tabuleiro, posições)
+CATEGORIES = {
+    "opening": ((2, 8), 5),
+    "midgame": ((12, 20), 5),
+    "tactical": ((8, 26), 5),
+    "endgame": ((26, 32), 5),
+}
+
+def _is_tactical(board: List[List[int]], turn: int) -> bool:
+    """Quem joga tem vitória imediata ou precisa bloquear uma."""
+    pos = search.Position.from_board(board)
+    occupied = pos.bits[P1] | pos.bits[P2]
+    playable = (occupied + search.BOTTOM_MASK) & search.BOARD_MASK
+    mine = search.winning_cells(pos.bits[turn], occupied) & playable
+    theirs = search.winning_cells(pos.bits[other(turn)], occupied) & playable
+    return bool(mine or theirs)
+
+def make_corpus(seed: int = 2024) -> Dict:
+    """
+    Sorteia partidas (jogadas de choose_move em profundidade 3 com 25% de
+    jogadas aleatórias) e guarda posições não terminais de cada categoria.
+    """
+    rng = random.Random(seed)
+    config = {'max_time_ms': 0, 'max_depth': 3, 'book': None, 'solver_empty': 0}
+    wanted = {name: n for name, (_, n) in CATEGORIES.items()}
+    positions = []
+    seen = set()
+    while any(wanted.values()):
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+        turn = P1
+        for ply in range(ROWS * COLS):
+            if search.terminal(board)[0]:
+                break
+            for name, ((lo, hi), _) in CATEGORIES.items():
+                if not wanted[name] or not lo <= ply <= hi or rng.random() > 0.3:
+                    continue
+                if name == "tactical" and not _is_tactical(board, turn):
+                    continue
+                key = (board_to_str(board), turn)
+                if key in seen:
+                    continue
+                seen.add(key)
+                wanted[name] -= 1
+                positions.append({'id': f"{name}-{CATEGORIES[name][1] - wanted[name]}",
+                                  'category': name, 'board': key[0], 'turn': turn})
+                break
+            if rng.random() < 0.25:
+                col = rng.choice(search.valid_moves(board))
+            else:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    col = search.choose_move(board, turn, config)
+            board = search.make_move(board, col, turn)
+            turn = other(turn)
+    positions.sort(key=lambda p: (list(CATEGORIES).index(p['category']), p['id']))
+    return {'version': CORPUS_VERSION, 'seed': seed, 'positions': positions}
+
+def load_corpus(path: str = CORPUS_FILE) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+# -----------------------------------------------------------------------------
+# Execução
+# -----------------------------------------------------------------------------
+
+def root_search(name: str, board: List[List[int]], turn: int, depth: int) -> Tuple[int, int]:
+    """Jogada escolhida e nós visitados por uma das funções de busca."""
+    if name == "choose_move":
+        config = dict(CHOOSE_MOVE_CONFIG, max_depth=depth)
+        col, stats = search.search_with_stats(board, turn, config, verbose=False)
+        return col, stats.nodes
+    stats = {'nodes_visited': 0, 'pruned': 0}
+    best_value, best_move = float('-inf'), None
+    alpha, beta = float('-inf'), float('inf')
+    for col in search.order_moves(board, search.valid_moves(board), turn):
+        child = search.make_move(board, col, turn)
+        if name == "minimax":
+            value = search.minimax(child, 1, depth, turn, False, stats)
+        else:
+            value = search.minimax_alphabeta(child, 1, depth, turn, False, alpha, beta, stats)
+            alpha = max(alpha, value)
+        if best_move is None or value > best_value:
+            best_value, best_move = value, col
+    return best_move, stats['nodes_visited']
+
+def run_suite(corpus: Dict, repeat: int = 3) -> Dict:
+    """Resultados por "função/posição" e totais por função."""
+    results = {}
+    totals = {}
+    for name, depth in SEARCHES:
+        total = totals[name] = {'depth': depth, 'nodes': 0, 'time_ms': 0.0}
+        for p in corpus['positions']:
+            board, turn = board_from_str(p['board']), p['turn']
+            best_ms = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                col, nodes = root_search(name, board, turn, depth)
+                ms = (time.perf_counter() - start) * 1000.0
+                best_ms = ms if best_ms is None else min(best_ms, ms)
+            results[f"{name}/{p['id']}"] = {
+                'depth': depth, 'nodes': nodes, 'time_ms': round(best_ms, 3),
+                'nps': round(nodes / (best_ms / 1000.0)) if best_ms > 0 else 0, 'move': col,
+            }
+            total['nodes'] += nodes
+            total['time_ms'] += best_ms
+        total['time_ms'] = round(total['time_ms'], 3)
+        total['nps'] = round(total['nodes'] / (total['time_ms'] / 1000.0)) if total['time_ms'] else 0
+    return {
+        'corpus_version': corpus['version'],
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'choose_move_config': CHOOSE_MOVE_CONFIG,
+        'totals': totals,
+        'results': results,
+    }
+
+def compare(current: Dict, baseline: Dict, node_threshold: float,
+            time_threshold: float) -> List[str]:
+    """Regressões de current em relação a baseline (lista vazia = ok)."""
+    if current['corpus_version'] != baseline['corpus_version']:
+        return [f"corpus v{current['corpus_version']} != linha de base "
+                f"v{baseline['corpus_version']}: rode com --update"]
+    regressions = []
+    for key, r in current['results'].items():
+        b = baseline['results'].get(key)
+        if b is None or b['depth'] != r['depth']:
+            continue
+        if r['nodes'] > b['nodes'] * (1 + node_threshold):
+            regressions.append(f"{key}: nós {b['nodes']} -> {r['nodes']} "
+                               f"(+{(r['nodes'] / max(1, b['nodes']) - 1) * 100:.1f}%)")
+        if r['move'] != b['move']:
+            print(f"  aviso: {key}: jogada {b['move']} -> {r['move']}")
+    for name, t in current['totals'].items():
+        b = baseline['totals'].get(name)
+        if b is None or b['depth'] != t['depth']:
+            continue
+        if t['time_ms'] > b['time_ms'] * (1 + time_threshold):
+            regressions.append(f"{name}: tempo {b['time_ms']:.0f} -> {t['time_ms']:.0f} ms "
+                               f"(+{(t['time_ms'] / b['time_ms'] - 1) * 100:.1f}%)")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark determinístico de nós")
+    parser.add_argument("--update", action="store_true", help="grava a linha de base")
+    parser.add_argument("--make-corpus", action="store_true", help="regera o corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por medida (melhor tempo)")
+    parser.add_argument("--node-threshold", type=float, default=NODE_THRESHOLD)
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    if args.make_corpus:
+        corpus = make_corpus()
+        with open(CORPUS_FILE, 'w') as f:
+            json.dump(corpus, f, indent=1)
+        print(f"{len(corpus['positions'])} posições gravadas em {CORPUS_FILE}")
+        sys.exit(0)
+
+    corpus = load_corpus()
+    current = run_suite(corpus, args.repeat)
+    print(f"Corpus v{corpus['version']}, {len(corpus['positions'])} posições")
+    print(f"{'busca':<18} {'prof':>4} {'nós':>10} {'tempo (ms)':>11} {'nós/s':>9}")
+    for name, t in current['totals'].items():
+        print(f"{name:<18} {t['depth']:>4} {t['nodes']:>10} {t['time_ms']:>11.1f} {t['nps']:>9}")
+
+    if args.update or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=1)
+        print(f"Linha de base gravada em {args.baseline}")
+        sys.exit(0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.node_threshold, args.time_threshold)
+    if regressions:
+        print("REGRESSÕES:")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+    print("Sem regressões em relação à linha de base")
@@ -0,0 +1,67 @@
+"""
+Compara variantes da busca (config["algorithm"] e config["ordering"]) nas
+mesmas posições: nós visitados, qualidade da ordenação (podas na primeira
+jogada, jogadas tentadas até a poda), tempo e jogada escolhida por
+choose_move em profundidade fixa.
+
+Uso:
+    python compare_algorithms.py [profundidade] [num_posicoes]
+"""
+
+import io
+import time
+import contextlib
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+from benchmark_alloc import random_positions
+
+# (nome, configuração extra); a primeira é a referência
+VARIANTS = [
+    ("ab/center", {'algorithm': 'alphabeta', 'ordering': 'center'}),
+    ("ab/killers", {'algorithm': 'alphabeta', 'ordering': 'killers'}),
+    ("ab/history", {'algorithm': 'alphabeta', 'ordering': 'history'}),
+    ("ab/killers_history", {'algorithm': 'alphabeta', 'ordering': 'killers_history'}),
+    ("pvs/center", {'algorithm': 'pvs', 'ordering': 'center'}),
+    ("pvs/killers_history", {'algorithm': 'pvs', 'ordering': 'killers_history'}),
+]
+
+def compare(max_depth: int = 6, num_positions: int = 10):
+    totals = {name: {'nodes': 0, 'time': 0.0, 'cutoffs': 0, 'first': 0.0, 'tried': 0.0}
+              for name, _ in VARIANTS}
+    agree = 0
+    for board, turn in random_positions(num_positions):
+        moves = []
+        for name, extra in VARIANTS:
+            # Sem livro: uma consulta ao livro não mede a busca
+            config = dict({'max_time_ms': 0, 'max_depth': max_depth, 'book': None}, **extra)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                col, stats = search.search_with_stats(board, turn, config)
+            moves.append(col)
+            info = stats.details
+            t = totals[name]
+            t['time'] += time.perf_counter() - start
+            t['nodes'] += info['nodes_visited']
+            # Médias ponderadas pelo número de podas
+            cutoffs = info.get('pruned_nodes', 0)
+            t['cutoffs'] += cutoffs
+            t['first'] += info.get('first_move_cutoff_rate', 0.0) * cutoffs
+            t['tried'] += info.get('avg_moves_to_cutoff', 0.0) * cutoffs
+        agree += len(set(moves)) == 1
+    return totals, agree
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    totals, agree = compare(depth, n)
+    base = totals[VARIANTS[0][0]]['nodes']
+    print(f"Profundidade {depth}, {n} posições (mesma jogada em {agree}/{n})")
+    print(f"{'variante':<22} {'nós':>9} {'vs ref':>7} {'corte 1ª':>9} {'jog/corte':>10} {'tempo (s)':>10}")
+    for name, _ in VARIANTS:
+        t = totals[name]
+        cut = max(1, t['cutoffs'])
+        print(f"{name:<22} {t['nodes']:>9} {t['nodes'] / base:>7.2f} "
+              f"{t['first'] / cut:>9.2f} {t['tried'] / cut:>10.2f} {t['time']:>10.2f}")
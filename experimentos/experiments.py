@@ -5,34 +5,53 @@ Coleta métricas conforme especificado nas instruções do TP2.
 
 import time
 import random
-from typing import List, Tuple, Dict
+import json
+import zlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import List, Tuple, Dict, Optional
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from search import (
-    choose_move, valid_moves, make_move, terminal, winner, 
+    search_with_stats, valid_moves, make_move, terminal, winner, 
     EMPTY, P1, P2, ROWS, COLS, copy_board
 )
+from game_record import GameRecord, GameRecordWriter, read_records
 
 def play_game(player1_func, player2_func, config1: Dict, config2: Dict, 
-              max_moves: int = 42, timeout_per_move: float = 10.0) -> Tuple[int, Dict]:
+              max_moves: int = 42, timeout_per_move: float = 10.0,
+              start_board: Optional[List[List[int]]] = None) -> Tuple[int, Dict]:
     """
     Executa uma partida completa entre dois jogadores.
     
+    start_board: posição inicial (ex.: uma abertura); player1_func joga
+    sempre as peças 1, e a vez é de quem tiver menos peças.
+    
     Retorna:
-        (vencedor, estatísticas) onde vencedor é 0 (empate), 1 ou 2
+        (vencedor, estatísticas) onde vencedor é 0 (empate), 1 ou 2; as
+        estatísticas também têm, por jogada, a coluna, o tempo e os nós
+        (columns, move_time, move_nodes)
     """
-    board = [[EMPTY] * COLS for _ in range(ROWS)]
+    if start_board is None:
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+    else:
+        board = copy_board(start_board)
     stats = {
         'moves': 0,
         'player1_time': [],
         'player2_time': [],
         'player1_nodes': [],
-        'player2_nodes': []
+        'player2_nodes': [],
+        'columns': [],
+        'move_time': [],
+        'move_nodes': []
     }
     
-    turn = P1
+    pieces = sum(v != EMPTY for row in board for v in row)
+    turn = P1 if pieces % 2 == 0 else P2
     for move_num in range(max_moves):
         # Verificar se o jogo terminou
         is_term, winner_player = terminal(board)
@@ -70,6 +89,7 @@ def play_game(player1_func, player2_func, config1: Dict, config2: Dict,
             # Em caso de erro, escolher primeira jogada válida
             legal = valid_moves(board)
             col = legal[0] if legal else 0
+        move_time = (time.time() - start_time) * 1000
         
         # Aplicar jogada
         new_board = make_move(board, col, turn)
@@ -78,6 +98,9 @@ def play_game(player1_func, player2_func, config1: Dict, config2: Dict,
             return other(turn), stats
         board = new_board
         stats['moves'] += 1
+        stats['columns'].append(col)
+        stats['move_time'].append(move_time)
+        stats['move_nodes'].append(_last_stats.get('nodes_visited', 0))
         
         # Alternar turno
         turn = P2 if turn == P1 else P1
@@ -164,83 +187,140 @@ def alphabeta_player(board: List[List[int]], turn: int, config: Dict) -> int:
     return best_move
 
 def iterative_deepening_player(board: List[List[int]], turn: int, config: Dict) -> int:
-    """Jogador usando Iterative Deepening (usa choose_move atual)."""
-    # choose_move já usa Iterative Deepening, mas não retorna stats
-    # Vamos usar uma versão que coleta estatísticas
-    from search import minimax_alphabeta, valid_moves, make_move, order_moves
-    import time
-    
-    max_time_ms = int(config.get("max_time_ms", 2000))
-    max_depth = int(config.get("max_depth", 10))
-    start = time.time()
-    
-    def time_exceeded():
-        return max_time_ms > 0 and (time.time() - start) * 1000.0 >= max_time_ms
-    
-    legal = valid_moves(board)
-    if not legal:
-        return 0
-    
-    stats = {'nodes_visited': 0, 'pruned': 0}
-    best_move = legal[0]
-    best_value = float('-inf')
-    final_depth = 1
-    
-    # Iterative Deepening
-    for current_depth in range(1, max_depth + 1):
-        if time_exceeded():
-            break
-        
-        depth_stats = {'nodes_visited': 0, 'pruned': 0}
-        depth_best_value = float('-inf')
-        depth_best_move = best_move
-        alpha = float('-inf')
-        beta = float('inf')
-        
-        ordered_moves = order_moves(board, legal, turn)
-        for col in ordered_moves:
-            if time_exceeded():
-                break
-            
-            new_board = make_move(board, col, turn)
-            if new_board is not None:
-                value = minimax_alphabeta(new_board, depth=1, max_depth=current_depth, 
-                                        player=turn, is_maximizing=False, 
-                                        alpha=alpha, beta=beta, stats=depth_stats)
-                if value > depth_best_value:
-                    depth_best_value = value
-                    depth_best_move = col
-                alpha = max(alpha, depth_best_value)
-        
-        if not time_exceeded() or current_depth == 1:
-            best_move = depth_best_move
-            best_value = depth_best_value
-            final_depth = current_depth
-            stats['nodes_visited'] += depth_stats['nodes_visited']
-            stats['pruned'] += depth_stats.get('pruned', 0)
-        else:
-            break
-    
+    """Jogador usando Iterative Deepening (choose_move, com as estatísticas da busca)."""
+    col, search_stats = search_with_stats(board, turn, config, verbose=False)
     global _last_stats
     _last_stats = {
-        'nodes_visited': stats['nodes_visited'],
-        'pruned_nodes': stats.get('pruned', 0),
-        'depth_reached': final_depth
+        'nodes_visited': search_stats.nodes,
+        'pruned_nodes': search_stats.cutoffs,
+        'depth_reached': search_stats.depth_reached
     }
-    
-    return best_move
+    return col
+
+# Execução das partidas: processos em paralelo, registro de cada partida em
+# disco assim que termina (game_record, com jogadas, tempos e nós) e semente
+# por partida.
+# Configurados pela linha de comando no __main__.
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'experiment_results.json')
+GAMES_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'experiment_games.c4g')
+WORKERS = os.cpu_count() or 1
+BASE_SEED = 0
+
+def game_seed(name: str, game_num: int, base_seed: int = 0) -> int:
+    """Semente da partida: depende só do experimento, do número e da base."""
+    return zlib.crc32(f"{base_seed}:{name}:{game_num}".encode())
+
+def play_experiment_game(name: str, game_num: int, seed: int, player1_func, player2_func,
+                         config1: Dict, config2: Dict) -> GameRecord:
+    """
+    Uma partida do experimento, com a semente fixada antes da primeira jogada
+    (random_player fica reprodutível). Jogos ímpares começam com o jogador 1
+    do experimento, pares com o jogador 2 (metadata['swapped']). O registro
+    fica na perspectiva do tabuleiro; experiment_view o converte.
+    """
+    random.seed(seed)
+    start = time.time()
+    swapped = game_num % 2 == 0
+    players = [(player1_func, config1), (player2_func, config2)]
+    if swapped:
+        players.reverse()
+    (first, first_config), (second, second_config) = players
+    winner, stats = play_game(first, second, first_config, second_config, timeout_per_move=15.0)
+    return GameRecord(stats['columns'], winner, stats['move_time'], stats['move_nodes'], {
+        'experiment': name,
+        'game': game_num,
+        'seed': seed,
+        'swapped': swapped,
+        'players': [first.__name__, second.__name__],
+        'configs': [first_config, second_config],
+        'elapsed_s': time.time() - start
+    })
+
+def experiment_view(record: GameRecord) -> Dict:
+    """
+    Resumo da partida na perspectiva do experimento (vencedor 1 =
+    player1_func), com os tempos e nós de cada jogador.
+    """
+    meta = record.metadata
+    winner = record.winner
+    sides = [0, 1]  # índices das jogadas do jogador 1 e do 2 do experimento
+    if meta['swapped']:
+        # Inverter resultado e estatísticas (player1 e player2 foram trocados)
+        winner = {P1: P2, P2: P1}.get(winner, 0)
+        sides.reverse()
+    return {
+        'experiment': meta['experiment'],
+        'game': meta['game'],
+        'seed': meta['seed'],
+        'winner': winner,
+        'moves': len(record.columns),
+        'player1_time': record.times_ms[sides[0]::2],
+        'player2_time': record.times_ms[sides[1]::2],
+        'player1_nodes': record.nodes[sides[0]::2],
+        'player2_nodes': record.nodes[sides[1]::2],
+        'elapsed_s': meta['elapsed_s']
+    }
+
+def load_game_log(path: Optional[str]) -> Dict[str, Dict[int, Dict]]:
+    """Partidas já registradas em path: {experimento: {número: experiment_view}}."""
+    games: Dict[str, Dict[int, Dict]] = {}
+    if not path:
+        return games
+    for record in read_records(path):
+        view = experiment_view(record)
+        games.setdefault(view['experiment'], {})[view['game']] = view
+    return games
 
 def run_experiment(name: str, player1_func, player2_func, 
-                  config1: Dict, config2: Dict, num_games: int = 10) -> Dict:
+                  config1: Dict, config2: Dict, num_games: int = 10,
+                  workers: Optional[int] = None, log_path: Optional[str] = None) -> Dict:
     """
     Executa um experimento: num_games partidas entre dois jogadores.
+
+    As partidas são distribuídas entre workers processos (padrão WORKERS) e
+    cada uma é acrescentada a log_path (padrão GAMES_LOG, no formato de
+    game_record) ao terminar; partidas deste experimento que já estão no
+    arquivo não são jogadas de novo (retomada).
     
     Retorna estatísticas agregadas.
     """
+    workers = WORKERS if workers is None else workers
+    log_path = GAMES_LOG if log_path is None else log_path
     print(f"\n{'='*60}")
     print(f"Experimento: {name}")
     print(f"{'='*60}")
     
+    records = {g: r for g, r in load_game_log(log_path).get(name, {}).items() if g <= num_games}
+    if records:
+        print(f"Retomando: {len(records)}/{num_games} partidas já registradas")
+    pending = [g for g in range(1, num_games + 1) if g not in records]
+    
+    writer = GameRecordWriter(log_path) if log_path else None
+    
+    def finished(game: GameRecord) -> None:
+        if writer:
+            writer.write(game)
+        record = records[game.metadata['game']] = experiment_view(game)
+        winner = record['winner']
+        extra = f" (demorou {record['elapsed_s']:.1f}s)" if record['elapsed_s'] > 60 else ""
+        print(f"Jogo {record['game']}/{num_games}: Vencedor: {winner if winner else 'Empate'}{extra}",
+              flush=True)
+    
+    tasks = [(name, g, game_seed(name, g, BASE_SEED), player1_func, player2_func, config1, config2)
+             for g in pending]
+    try:
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(min(workers, len(tasks)), mp_context=get_context("spawn")) as pool:
+                futures = [pool.submit(play_experiment_game, *t) for t in tasks]
+                for future in as_completed(futures):
+                    finished(future.result())
+        else:
+            for t in tasks:
+                finished(play_experiment_game(*t))
+    finally:
+        if writer:
+            writer.close()
+    
     results = {
         'player1_wins': 0,
         'player2_wins': 0,
@@ -249,7 +329,8 @@ def run_experiment(name: str, player1_func, player2_func,
         'player2_avg_time': 0.0,
         'player1_avg_nodes': 0.0,
         'player2_avg_nodes': 0.0,
-        'total_games': num_games
+        'total_games': num_games,
+        'base_seed': BASE_SEED
     }
     
     all_p1_times = []
@@ -258,42 +339,18 @@ def run_experiment(name: str, player1_func, player2_func,
     all_p2_nodes = []
     
     for game_num in range(1, num_games + 1):
-        print(f"Jogo {game_num}/{num_games}...", end=" ", flush=True)
-        game_start = time.time()
-        
-        # Alternar quem começa
-        if game_num % 2 == 1:
-            winner, stats = play_game(player1_func, player2_func, config1, config2, timeout_per_move=15.0)
-            # Estatísticas já estão na ordem correta
-            all_p1_times.extend(stats.get('player1_time', []))
-            all_p2_times.extend(stats.get('player2_time', []))
-            all_p1_nodes.extend(stats.get('player1_nodes', []))
-            all_p2_nodes.extend(stats.get('player2_nodes', []))
-        else:
-            winner, stats = play_game(player2_func, player1_func, config2, config1, timeout_per_move=15.0)
-            # Inverter resultado do jogo
-            if winner == P1:
-                winner = P2
-            elif winner == P2:
-                winner = P1
-            # Inverter estatísticas também (player1 e player2 foram trocados)
-            all_p1_times.extend(stats.get('player2_time', []))  # player2 do jogo = player1 do experimento
-            all_p2_times.extend(stats.get('player1_time', []))  # player1 do jogo = player2 do experimento
-            all_p1_nodes.extend(stats.get('player2_nodes', []))
-            all_p2_nodes.extend(stats.get('player1_nodes', []))
+        record = records[game_num]
+        all_p1_times.extend(record['player1_time'])
+        all_p2_times.extend(record['player2_time'])
+        all_p1_nodes.extend(record['player1_nodes'])
+        all_p2_nodes.extend(record['player2_nodes'])
         
-        game_time = time.time() - game_start
-        if game_time > 60:  # Se o jogo demorou mais de 1 minuto
-            print(f" (demorou {game_time:.1f}s)", end="")
-        
-        if winner == P1:
+        if record['winner'] == P1:
             results['player1_wins'] += 1
-        elif winner == P2:
+        elif record['winner'] == P2:
             results['player2_wins'] += 1
         else:
             results['draws'] += 1
-        
-        print(f"Vencedor: {winner if winner else 'Empate'}")
     
     # Calcular médias
     if all_p1_times:
@@ -375,7 +432,8 @@ def experiment_3_iterative_vs_alphabeta():
     
     results = {}
     for time_limit_ms in [1000, 2000]:
-        config_id = {'max_depth': 10, 'max_time_ms': time_limit_ms}  # ID com limite de tempo
+        # ID com limite de tempo, sem livro (jogadas do livro não medem a busca)
+        config_id = {'max_depth': 10, 'max_time_ms': time_limit_ms, 'book': None}
         config_ab = {'max_depth': 4, 'max_time_ms': time_limit_ms}  # AB fixo (profundidade 4, reduzida)
         
         result = run_experiment(
@@ -390,30 +448,45 @@ def experiment_3_iterative_vs_alphabeta():
     
     return results
 
+EXPERIMENTS = [
+    ('experiment_1', experiment_1_minimax_vs_random),
+    ('experiment_2', experiment_2_alphabeta_vs_minimax),
+    ('experiment_3', experiment_3_iterative_vs_alphabeta),
+]
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Experimentos do TP2")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="processos para as partidas (1 = em série)")
+    parser.add_argument("--seed", type=int, default=BASE_SEED,
+                        help="semente base (cada partida deriva a sua)")
+    parser.add_argument("--resume", action="store_true",
+                        help="reaproveita experiment_results.json e as partidas já registradas")
+    args = parser.parse_args()
+    WORKERS, BASE_SEED = args.workers, args.seed
+
     print("="*60)
     print("EXECUTANDO EXPERIMENTOS DO TP2")
     print("="*60)
     
-    # Executar experimentos
-    exp1_results = experiment_1_minimax_vs_random()
-    exp2_results = experiment_2_alphabeta_vs_minimax()
-    exp3_results = experiment_3_iterative_vs_alphabeta()
+    all_results = {}
+    if args.resume and os.path.exists(RESULTS_FILE):
+        with open(RESULTS_FILE) as f:
+            all_results = json.load(f)
+    elif os.path.exists(GAMES_LOG):
+        os.remove(GAMES_LOG)  # execução nova: descarta as partidas anteriores
+    
+    # Executar experimentos (os já concluídos ficam de fora na retomada); o
+    # arquivo de resultados é regravado a cada experimento concluído
+    for key, experiment in EXPERIMENTS:
+        if key in all_results:
+            print(f"\n{key}: já concluído, mantido de {os.path.basename(RESULTS_FILE)}")
+            continue
+        all_results[key] = experiment()
+        with open(RESULTS_FILE, 'w') as f:
+            json.dump(all_results, f, indent=2)
     
     print("\n" + "="*60)
     print("TODOS OS EXPERIMENTOS CONCLUÍDOS")
     print("="*60)
-    
-    # Salvar resultados em arquivo
-    results_file = os.path.join(os.path.dirname(__file__), 'experiment_results.json')
-    import json
-    all_results = {
-        'experiment_1': exp1_results,
-        'experiment_2': exp2_results,
-        'experiment_3': exp3_results
-    }
-    
-    with open(results_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
-    
     print("\nResultados salvos em 'experiment_results.json'")
@@ -0,0 +1,141 @@
+"""
+Autojogo em alta vazão para gerar dados (treino, livro de aberturas).
+
+Cada lado joga com choose_move em profundidade fixa (--depth, tempo 0) ou em
+tempo fixo (--time-ms, profundidade máxima), com uma tabela de transposição
+por lado mantida durante a partida. Para as partidas não se repetirem, as
+primeiras --random-plies jogadas e, depois, cada jogada com probabilidade
+--epsilon são sorteadas. O tabuleiro é uma Position atualizada com play (sem
+cópias) e o fim de jogo é checado só pela última peça.
+
+Cada partida vira uma linha "<colunas> <resultado>", com as colunas (0..6)
+jogadas em sequência e o resultado 1, 2 ou 0 (empate), por exemplo
+"3323144 1". Os lotes de partidas rodam em --workers processos; o progresso
+mostra partidas/s e jogadas/s.
+
+Uso:
+    python selfplay.py --games 1000 --depth 4 [--depth2 6] [--time-ms2 50]
+                       [--epsilon 0.05] [--random-plies 2] [--out selfplay.txt]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Dict, List, Tuple
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+from search import P1, P2, other
+
+def side_config(depth: int, time_ms: int) -> Dict:
+    """
+    Tempo fixo se time_ms > 0 (profundidade até o fim), senão profundidade
+    fixa. Sem livro: as jogadas/s medem a busca, e as aberturas já variam
+    pelas jogadas aleatórias.
+    """
+    if time_ms > 0:
+        return {'max_time_ms': time_ms, 'max_depth': search.ROWS * search.COLS, 'book': None}
+    return {'max_time_ms': 0, 'max_depth': depth, 'book': None}
+
+def play_selfplay_game(configs: Dict[int, Dict], epsilon: float, random_plies: int,
+                       tt_mb: float, rng: random.Random) -> Tuple[str, int]:
+    """Uma partida; retorna (colunas jogadas, vencedor com 0 = empate)."""
+    pos = search.Position()
+    tables = {p: search.TranspositionTable(tt_mb) if tt_mb > 0 else None for p in (P1, P2)}
+    moves = []
+    turn = P1
+    winner = 0
+    while True:
+        if len(moves) < random_plies or rng.random() < epsilon:
+            col = rng.choice(pos.valid_moves())
+        else:
+            # pos.grid é a matriz 6x7 mantida no lugar: nenhuma cópia por jogada
+            col = search.choose_move(pos.grid, turn, configs[turn], tt=tables[turn],
+                                     verbose=False)
+        pos.play(col, turn)
+        moves.append(str(col))
+        is_terminal, winner = pos.terminal()
+        if is_terminal:
+            break
+        turn = other(turn)
+    return ''.join(moves), winner
+
+def play_batch(configs: Dict[int, Dict], epsilon: float, random_plies: int, tt_mb: float,
+               seed: int, count: int) -> List[str]:
+    """count partidas com a semente do lote; retorna as linhas dos registros."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        moves, winner = play_selfplay_game(configs, epsilon, random_plies, tt_mb, rng)
+        lines.append(f"{moves} {winner}")
+    return lines
+
+def run_selfplay(games: int, configs: Dict[int, Dict], out: str, workers: int = 1,
+                 epsilon: float = 0.05, random_plies: int = 2, tt_mb: float = 1.0,
+                 batch: int = 20, seed: int = 0) -> Dict:
+    """Joga games partidas em lotes, acrescentando os registros a out."""
+    sizes = [min(batch, games - i) for i in range(0, games, batch)]
+    tasks = [(configs, epsilon, random_plies, tt_mb, seed * 1000003 + i, n)
+             for i, n in enumerate(sizes)]
+    done_games = done_moves = 0
+    wins = {0: 0, P1: 0, P2: 0}
+    start = time.time()
+    with open(out, 'a') as f:
+        def write(lines: List[str]) -> None:
+            nonlocal done_games, done_moves
+            for line in lines:
+                f.write(line + "\n")
+                moves, result = line.split()
+                done_games += 1
+                done_moves += len(moves)
+                wins[int(result)] += 1
+            f.flush()
+            elapsed = time.time() - start
+            print(f"{done_games}/{games} partidas  {done_games / elapsed:.2f} partidas/s  "
+                  f"{done_moves / elapsed:.1f} jogadas/s", flush=True)
+
+        if workers > 1:
+            with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+                futures = [pool.submit(play_batch, *t) for t in tasks]
+                for future in as_completed(futures):
+                    write(future.result())
+        else:
+            for t in tasks:
+                write(play_batch(*t))
+    elapsed = time.time() - start
+    return {'games': done_games, 'moves': done_moves, 'seconds': elapsed,
+            'games_per_s': done_games / elapsed, 'moves_per_s': done_moves / elapsed,
+            'p1_wins': wins[P1], 'p2_wins': wins[P2], 'draws': wins[0]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autojogo em alta vazão")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=4, help="profundidade do jogador 1")
+    parser.add_argument("--time-ms", type=int, default=0, help="tempo do jogador 1 (0 = profundidade fixa)")
+    parser.add_argument("--depth2", type=int, help="profundidade do jogador 2 (padrão: a do 1)")
+    parser.add_argument("--time-ms2", type=int, help="tempo do jogador 2 (padrão: o do 1)")
+    parser.add_argument("--epsilon", type=float, default=0.05, help="chance de jogada aleatória")
+    parser.add_argument("--random-plies", type=int, default=2, help="jogadas iniciais aleatórias")
+    parser.add_argument("--tt-mb", type=float, default=1.0, help="tabela de cada lado, por partida")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch", type=int, default=20, help="partidas por tarefa")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="selfplay.txt")
+    args = parser.parse_args()
+
+    configs = {
+        P1: side_config(args.depth, args.time_ms),
+        P2: side_config(args.depth if args.depth2 is None else args.depth2,
+                        args.time_ms if args.time_ms2 is None else args.time_ms2),
+    }
+    print(f"Jogador 1: {configs[P1]}\nJogador 2: {configs[P2]}")
+    result = run_selfplay(args.games, configs, args.out, args.workers, args.epsilon,
+                          args.random_plies, args.tt_mb, args.batch, args.seed)
+    print(f"\n{result['games']} partidas, {result['moves']} jogadas em {result['seconds']:.1f} s: "
+          f"{result['games_per_s']:.2f} partidas/s, {result['moves_per_s']:.1f} jogadas/s")
+    print(f"Vitórias J1: {result['p1_wins']}  J2: {result['p2_wins']}  Empates: {result['draws']}")
+    print(f"Registros acrescentados a {args.out}")
@@ -0,0 +1,248 @@
+"""
+Torneio entre duas configurações de choose_move (A e B) para decidir se uma
+mudança deixa a engine mais forte com o mesmo orçamento de tempo.
+
+Cada abertura de um conjunto equilibrado (posições com --plies peças cujo
+valor no livro, ou numa busca rasa, fica dentro de --balance) é jogada duas
+vezes, trocando as cores, com experiments.play_game. O resultado é a
+diferença de Elo de A sobre B com intervalo de confiança de 95%; com SPRT
+(padrão) o torneio para assim que a razão de log-verossimilhança entre
+H0: Elo = --elo0 e H1: Elo = --elo1 cruza um dos limites.
+
+Uso:
+    python tournament.py --a '{"max_time_ms": 100, "algorithm": "pvs"}' \\
+                         --b '{"max_time_ms": 100}' [--games 400] [--workers N]
+"""
+
+import sys
+import os
+import json
+import math
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import get_context
+from typing import Dict, List, Tuple
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+import experiments
+from build_book import enumerate_positions
+from search import P1, P2
+
+# Configuração comum às duas variantes (cada uma sobrescreve o que quiser)
+BASE_CONFIG = {'max_time_ms': 100, 'max_depth': 42}
+
+# -----------------------------------------------------------------------------
+# Aberturas
+# -----------------------------------------------------------------------------
+
+def balanced_openings(plies: int = 4, balance: float = 100.0, limit: int = 0,
+                      seed: int = 0) -> List[List[List[int]]]:
+    """
+    Posições com exatamente plies peças (uma por par espelhado) cujo valor
+    para quem joga está em [-balance, balance]. O valor vem do livro de
+    aberturas e, para posições fora dele, de uma busca de profundidade 8.
+    limit > 0 sorteia (com seed) esse número de aberturas.
+    """
+    openings = []
+    for board, turn in enumerate_positions(plies):
+        if sum(v != search.EMPTY for row in board for v in row) != plies:
+            continue
+        hit = search.probe_book(search.Position.from_board(board), turn,
+                                search.DEFAULT_BOOK_PATH)
+        if hit is not None:
+            score = hit[1]
+        else:
+            _, stats = search.search_with_stats(
+                board, turn, {'max_time_ms': 0, 'max_depth': 8, 'book': None}, verbose=False)
+            score = stats.score
+        if abs(score) <= balance:
+            openings.append(board)
+    if limit and limit < len(openings):
+        openings = random.Random(seed).sample(openings, limit)
+    return openings
+
+# -----------------------------------------------------------------------------
+# Estatística
+# -----------------------------------------------------------------------------
+
+def expected_score(elo: float) -> float:
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+def elo_from_score(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+def score_variance(wins: int, draws: int, losses: int) -> float:
+    """
+    Variância do placar de uma partida. Meia vitória e meia derrota a mais
+    evitam variância zero em placares como 8-0, que travariam o SPRT.
+    """
+    w, l = wins + 0.5, losses + 0.5
+    n = w + draws + l
+    score = (w + 0.5 * draws) / n
+    return (w * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + l * score ** 2) / n
+
+def elo_interval(wins: int, draws: int, losses: int) -> Tuple[float, float, float]:
+    """Diferença de Elo e intervalo de 95% (aproximação normal do placar médio)."""
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0, -math.inf, math.inf
+    score = (wins + 0.5 * draws) / n
+    var = score_variance(wins, draws, losses)
+    margin = 1.96 * math.sqrt(var / n)
+    return elo_from_score(score), elo_from_score(score - margin), elo_from_score(score + margin)
+
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """
+    Razão de log-verossimilhança de H1 (Elo = elo1) contra H0 (Elo = elo0),
+    pela aproximação normal do placar (GSPRT, como no fishtest).
+    """
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0
+    score = (wins + 0.5 * draws) / n
+    var = score_variance(wins, draws, losses)
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    return n * (s1 - s0) * (2 * score - s0 - s1) / (2 * var)
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+# -----------------------------------------------------------------------------
+# Partidas
+# -----------------------------------------------------------------------------
+
+def engine_player(board: List[List[int]], turn: int, config: Dict) -> int:
+    """choose_move silencioso, publicando os nós para play_game."""
+    col, stats = search.search_with_stats(board, turn, config, verbose=False)
+    experiments._last_stats = {'nodes_visited': stats.nodes}
+    return col
+
+def play_pair_game(opening: List[List[int]], config_a: Dict, config_b: Dict,
+                   a_first: bool, seed: int) -> float:
+    """Uma partida a partir de opening; retorna os pontos de A (1, 0.5 ou 0)."""
+    random.seed(seed)
+    if a_first:
+        winner, _ = experiments.play_game(engine_player, engine_player, config_a, config_b,
+                                          start_board=opening)
+        a_piece = P1
+    else:
+        winner, _ = experiments.play_game(engine_player, engine_player, config_b, config_a,
+                                          start_board=opening)
+        a_piece = P2
+    return 0.5 if winner == 0 else float(winner == a_piece)
+
+def run_match(config_a: Dict, config_b: Dict, openings: List[List[List[int]]],
+              max_games: int = 400, workers: int = 1, sprt: bool = True,
+              elo0: float = 0.0, elo1: float = 20.0, alpha: float = 0.05,
+              beta: float = 0.05, seed: int = 0) -> Dict:
+    """
+    Joga até max_games partidas em pares de cores trocadas (percorrendo as
+    aberturas em ordem circular) e retorna placar, Elo e decisão do SPRT.
+
+    O placar e o SPRT só andam com pares completos: parar no meio de um par
+    deixaria a vantagem de quem começa no resultado. Partidas que terminam
+    depois da decisão não contam.
+    """
+    lower, upper = sprt_bounds(alpha, beta)
+    num_pairs = max(1, max_games // 2)
+    tasks = []
+    for g in range(2 * num_pairs):
+        opening = openings[(g // 2) % len(openings)]
+        tasks.append((opening, config_a, config_b, g % 2 == 0, seed * 1000003 + g))
+    wins = draws = losses = 0
+    llr, decision = 0.0, None
+    pairs: Dict[int, List[float]] = {}
+
+    def record(game: int, points: float) -> None:
+        """Guarda a partida; com o par completo, atualiza placar e SPRT."""
+        nonlocal wins, draws, losses, llr, decision
+        pair = pairs.setdefault(game // 2, [])
+        pair.append(points)
+        if len(pair) < 2 or decision is not None:
+            return
+        for p in pair:
+            if p == 1.0:
+                wins += 1
+            elif p == 0.5:
+                draws += 1
+            else:
+                losses += 1
+        n = wins + draws + losses
+        elo, lo, hi = elo_interval(wins, draws, losses)
+        line = f"{n:>5} jogos: +{wins} ={draws} -{losses}  Elo {elo:+.1f} [{lo:+.1f}, {hi:+.1f}]"
+        if sprt:
+            llr = sprt_llr(wins, draws, losses, elo0, elo1)
+            line += f"  LLR {llr:+.2f} [{lower:.2f}, {upper:.2f}]"
+            if llr >= upper:
+                decision = "H1"
+            elif llr <= lower:
+                decision = "H0"
+        print(line, flush=True)
+
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"))
+        try:
+            pending = {}
+            queue = list(reversed(range(len(tasks))))
+            while (queue or pending) and decision is None:
+                while queue and len(pending) < 2 * workers:
+                    g = queue.pop()
+                    pending[pool.submit(play_pair_game, *tasks[g])] = g
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(pending.pop(future), future.result())
+        finally:
+            # Depois da decisão: descarta as partidas na fila e não espera as
+            # que estão em andamento
+            pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        for g, t in enumerate(tasks):
+            record(g, play_pair_game(*t))
+            if decision is not None:
+                break
+
+    elo, lo, hi = elo_interval(wins, draws, losses)
+    return {'games': wins + draws + losses, 'wins': wins, 'draws': draws, 'losses': losses,
+            'elo': elo, 'elo_low': lo, 'elo_high': hi, 'llr': llr,
+            'sprt': {'elo0': elo0, 'elo1': elo1, 'alpha': alpha, 'beta': beta,
+                     'bounds': [lower, upper], 'decision': decision} if sprt else None,
+            'config_a': config_a, 'config_b': config_b, 'openings': len(openings)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Torneio Elo/SPRT entre duas configurações")
+    parser.add_argument("--a", default="{}", help="config JSON da variante A (testada)")
+    parser.add_argument("--b", default="{}", help="config JSON da variante B (referência)")
+    parser.add_argument("--games", type=int, default=400, help="máximo de partidas")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--plies", type=int, default=4, help="peças nas aberturas")
+    parser.add_argument("--balance", type=float, default=100.0,
+                        help="valor máximo (em módulo) de uma abertura equilibrada")
+    parser.add_argument("--openings", type=int, default=0, help="sorteia N aberturas (0 = todas)")
+    parser.add_argument("--no-sprt", action="store_true", help="joga todas as partidas")
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=20.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    config_a = dict(BASE_CONFIG, **json.loads(args.a))
+    config_b = dict(BASE_CONFIG, **json.loads(args.b))
+    openings = balanced_openings(args.plies, args.balance, args.openings, args.seed)
+    print(f"A: {config_a}\nB: {config_b}\n{len(openings)} aberturas com {args.plies} peças")
+    result = run_match(config_a, config_b, openings, args.games, args.workers,
+                       not args.no_sprt, args.elo0, args.elo1, args.alpha, args.beta, args.seed)
+    print(f"\nResultado: Elo de A sobre B {result['elo']:+.1f} "
+          f"[{result['elo_low']:+.1f}, {result['elo_high']:+.1f}] em {result['games']} partidas")
+    if result['sprt']:
+        decision = result['sprt']['decision']
+        print("SPRT: " + {"H1": f"aceita H1 (Elo >= {args.elo1})",
+                          "H0": f"aceita H0 (Elo <= {args.elo0})",
+                          None: "inconclusivo"}[decision])
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,161 @@
+# game_record.py
+"""
+Registro binário compacto de partidas, para guardar cada partida jogada nos
+experimentos (e reanalisá-la depois) sem o volume do JSON.
+
+O arquivo começa com um cabeçalho (magic, versão) e só cresce: cada partida
+é acrescentada como um registro com prefixo (tamanho, CRC32) e corpo:
+
+    vencedor (0 = empate), jogadas, flags, tamanho dos metadados
+    metadados em JSON (configs das engines, experimento, semente...)
+    colunas empacotadas em 3 bits por jogada (jogada i nos bits 3i..3i+2)
+    tempo de cada jogada em ms (float32), se flags tem RECORD_TIMES
+    nós de cada jogada (uint32), se flags tem RECORD_NODES
+
+As colunas partem do tabuleiro vazio e o vencedor é pela cor (1 = quem
+começou). read_records lê um registro por vez; um registro cortado no fim
+(gravação interrompida) encerra a leitura, e GameRecordWriter o descarta
+antes de acrescentar novos.
+"""
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+RECORD_MAGIC = b"C4GR"
+RECORD_VERSION = 1
+FILE_HEADER = struct.Struct("<4sH")     # magic, versão
+RECORD_PREFIX = struct.Struct("<II")    # tamanho do corpo, CRC32 do corpo
+RECORD_HEADER = struct.Struct("<BBBH")  # vencedor, jogadas, flags, tamanho dos metadados
+
+RECORD_TIMES = 1
+RECORD_NODES = 2
+
+MAX_NODES = 0xFFFFFFFF
+
+@dataclass
+class GameRecord:
+    """Uma partida: colunas jogadas, vencedor e, por jogada, tempo e nós."""
+    columns: List[int]
+    winner: int
+    times_ms: List[float] = field(default_factory=list)
+    nodes: List[int] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+def pack_columns(columns: List[int]) -> bytes:
+    bits = 0
+    for i, col in enumerate(columns):
+        if not 0 <= col < 7:
+            raise ValueError(f"Coluna inválida no registro: {col}")
+        bits |= col << (3 * i)
+    return bits.to_bytes((3 * len(columns) + 7) // 8, "little")
+
+def unpack_columns(data: bytes, count: int) -> List[int]:
+    bits = int.from_bytes(data, "little")
+    return [(bits >> (3 * i)) & 7 for i in range(count)]
+
+def encode_record(record: GameRecord) -> bytes:
+    """Corpo do registro (sem o prefixo)."""
+    n = len(record.columns)
+    flags = 0
+    parts = []
+    meta = json.dumps(record.metadata, separators=(",", ":")).encode()
+    parts.append(pack_columns(record.columns))
+    if record.times_ms:
+        if len(record.times_ms) != n:
+            raise ValueError("times_ms precisa de um valor por jogada")
+        flags |= RECORD_TIMES
+        parts.append(struct.pack(f"<{n}f", *record.times_ms))
+    if record.nodes:
+        if len(record.nodes) != n:
+            raise ValueError("nodes precisa de um valor por jogada")
+        flags |= RECORD_NODES
+        parts.append(struct.pack(f"<{n}I", *(min(int(v), MAX_NODES) for v in record.nodes)))
+    return RECORD_HEADER.pack(record.winner, n, flags, len(meta)) + meta + b"".join(parts)
+
+def decode_record(body: bytes) -> GameRecord:
+    winner, n, flags, meta_len = RECORD_HEADER.unpack_from(body, 0)
+    offset = RECORD_HEADER.size
+    metadata = json.loads(body[offset:offset + meta_len]) if meta_len else {}
+    offset += meta_len
+    packed = (3 * n + 7) // 8
+    columns = unpack_columns(body[offset:offset + packed], n)
+    offset += packed
+    times_ms: List[float] = []
+    nodes: List[int] = []
+    if flags & RECORD_TIMES:
+        times_ms = list(struct.unpack_from(f"<{n}f", body, offset))
+        offset += 4 * n
+    if flags & RECORD_NODES:
+        nodes = list(struct.unpack_from(f"<{n}I", body, offset))
+    return GameRecord(columns, winner, times_ms, nodes, metadata)
+
+def _read_header(f: BinaryIO, path: str) -> bool:
+    """Valida o cabeçalho; False se o arquivo está vazio."""
+    data = f.read(FILE_HEADER.size)
+    if not data:
+        return False
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"Arquivo de partidas inválido: {path}")
+    magic, version = FILE_HEADER.unpack(data)
+    if magic != RECORD_MAGIC or version != RECORD_VERSION:
+        raise ValueError(f"Arquivo de partidas inválido: {path}")
+    return True
+
+def _scan(f: BinaryIO) -> Iterator[Tuple[bytes, int]]:
+    """(corpo, posição do fim do registro) de cada registro íntegro, em ordem."""
+    while True:
+        prefix = f.read(RECORD_PREFIX.size)
+        if len(prefix) < RECORD_PREFIX.size:
+            return
+        length, crc = RECORD_PREFIX.unpack(prefix)
+        body = f.read(length)
+        if len(body) < length or zlib.crc32(body) != crc:
+            return  # registro cortado por uma interrupção no meio da escrita
+        yield body, f.tell()
+
+def read_records(path: str) -> Iterator[GameRecord]:
+    """Gera as partidas do arquivo uma a uma, sem carregá-lo inteiro."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        if not _read_header(f, path):
+            return
+        for body, _ in _scan(f):
+            yield decode_record(body)
+
+class GameRecordWriter:
+    """
+    Acrescenta partidas ao arquivo (criado com o cabeçalho se não existir).
+    Cada write grava e descarrega um registro inteiro.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: Optional[BinaryIO] = open(path, "r+b" if os.path.exists(path) else "w+b")
+        end = FILE_HEADER.size
+        if _read_header(self._file, path):
+            for _, end in _scan(self._file):
+                pass
+        else:
+            self._file.write(FILE_HEADER.pack(RECORD_MAGIC, RECORD_VERSION))
+        self._file.seek(end)
+        self._file.truncate()
+
+    def write(self, record: GameRecord) -> None:
+        body = encode_record(record)
+        self._file.write(RECORD_PREFIX.pack(len(body), zlib.crc32(body)) + body)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "GameRecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
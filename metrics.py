@@ -0,0 +1,144 @@
+# metrics.py
+"""
+Métricas do servidor no formato de exposição de texto do Prometheus, sem
+dependências externas.
+
+Contadores e histogramas são atualizados pelas requisições (com lock: o Flask
+atende cada requisição numa thread). Métricas de callback são calculadas na
+hora da coleta por uma função (ex.: workers ocupados). Registry.render() gera
+o texto servido em /metrics.
+"""
+import math
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites superiores padrão dos histogramas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEPTH_BUCKETS = tuple(range(1, 21)) + (25.0, 30.0, 42.0)
+NPS_BUCKETS = (1e3, 2.5e3, 5e3, 1e4, 2.5e4, 5e4, 1e5, 2.5e5, 5e5, 1e6)
+
+def _fmt(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    """Contador monotônico, opcionalmente com rótulos."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labels:
+            self._values[()] = 0.0
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k)} {_fmt(v)}" for k, v in items]
+
+class Histogram:
+    """Histograma cumulativo (baldes le, _sum e _count)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._lock = threading.Lock()
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            self._sum += value
+            self._count += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{_fmt(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_fmt(total)}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+class CallbackMetric:
+    """
+    Valor lido na coleta: func() retorna um número ou, com rótulos, um dict
+    {(valores dos rótulos): número}. kind é "gauge" ou "counter".
+    """
+
+    def __init__(self, name: str, help: str, func: Callable, labels: Sequence[str] = (),
+                 kind: str = "gauge") -> None:
+        self.name = name
+        self.help = help
+        self.func = func
+        self.labels = tuple(labels)
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        value = self.func()
+        if not self.labels:
+            return [f"{self.name} {_fmt(value)}"]
+        return [f"{self.name}{_labels(self.labels, k)} {_fmt(v)}"
+                for k, v in sorted(value.items())]
+
+class Registry:
+    """Conjunto de métricas expostas juntas."""
+
+    def __init__(self) -> None:
+        self._metrics: List = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float]) -> Histogram:
+        return self._add(Histogram(name, help, buckets))
+
+    def callback(self, name: str, help: str, func: Callable, labels: Sequence[str] = (),
+                 kind: str = "gauge") -> CallbackMetric:
+        return self._add(CallbackMetric(name, help, func, labels, kind))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
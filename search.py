@@ -1,4 +1,14 @@
 from typing import List, Tuple, Optional, Dict
+from array import array
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing
+import atexit
+import queue
+import mmap
+import struct
+import os
 import time
 import math
 import random
@@ -70,6 +80,443 @@ def terminal(board: List[List[int]]) -> Tuple[bool, int]:
 def other(player: int) -> int:
     return P1 if player == P2 else P2
 
+# -----------------------------------------------------------------------------
+# Representação em bitboard (usada internamente pela busca)
+# -----------------------------------------------------------------------------
+# Cada coluna ocupa H = ROWS + 1 bits (6 casas + 1 bit sentinela), com a linha
+# de baixo no bit menos significativo: bit(col, linha) = col * H + linha, onde
+# linha 0 é a base do tabuleiro (board[ROWS - 1]).
+H = ROWS + 1
+BOTTOM_MASK = sum(1 << (c * H) for c in range(COLS))
+BOARD_MASK = BOTTOM_MASK * ((1 << ROWS) - 1)
+# Ordem de exploração "centro primeiro" (mesma ordem produzida por order_moves)
+CENTER_ORDER = (3, 2, 4, 1, 5, 0, 6)
+
+def _build_windows(length: int) -> Tuple[int, ...]:
+    """Máscaras de todas as janelas de length casas em linha (4 direções)."""
+    windows = []
+    for c in range(COLS):
+        for r in range(ROWS):
+            for dc, dr in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                cells = [(c + i * dc, r + i * dr) for i in range(length)]
+                if all(0 <= x < COLS and 0 <= y < ROWS for x, y in cells):
+                    windows.append(sum(1 << (x * H + y) for x, y in cells))
+    return tuple(windows)
+
+def _build_windows_by_bit(windows: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+    """Para cada casa, as máscaras das janelas que passam por ela."""
+    by_bit: List[List[int]] = [[] for _ in range(COLS * H)]
+    for mask in windows:
+        for b in range(COLS * H):
+            if mask >> b & 1:
+                by_bit[b].append(mask)
+    return [tuple(masks) for masks in by_bit]
+
+# As 69 janelas de 4 casas; no máximo 13 passam por cada casa
+WINDOWS_4 = _build_windows(4)
+WINDOWS_BY_BIT = _build_windows_by_bit(WINDOWS_4)
+
+def has_four(bits: int) -> bool:
+    """Detecta 4 em linha num bitboard de um jogador usando deslocamentos."""
+    # Vertical
+    m = bits & (bits >> 1)
+    if m & (m >> 2):
+        return True
+    # Horizontal
+    m = bits & (bits >> H)
+    if m & (m >> (2 * H)):
+        return True
+    # Diagonal ↗ (sobe uma linha a cada coluna)
+    m = bits & (bits >> (H + 1))
+    if m & (m >> (2 * (H + 1))):
+        return True
+    # Diagonal ↘ (desce uma linha a cada coluna)
+    m = bits & (bits >> (H - 1))
+    if m & (m >> (2 * (H - 1))):
+        return True
+    return False
+
+# Máscara de cada coluna inteira (6 casas)
+COLUMN_MASKS = tuple(((1 << ROWS) - 1) << (c * H) for c in range(COLS))
+
+def mirror_key(key: int) -> int:
+    """
+    Chave da posição espelhada (coluna c <-> COLS-1-c). Cada coluna ocupa seus
+    próprios H bits na chave (bits[P1] + máscara não transborda da coluna),
+    então basta inverter a ordem dos blocos. Durante a busca, prefira
+    Position.canonical_key, que não precisa deste laço.
+    """
+    block = (1 << H) - 1
+    mirrored = 0
+    for c in range(COLS):
+        mirrored |= ((key >> (c * H)) & block) << ((COLS - 1 - c) * H)
+    return mirrored
+
+def mirror_board(board: List[List[int]]) -> List[List[int]]:
+    """Tabuleiro espelhado (coluna c <-> COLS-1-c)."""
+    return [row[::-1] for row in board]
+
+def winning_cells(bits: int, occupied: int) -> int:
+    """
+    Casas vazias que completariam 4 em linha para o jogador dono de bits
+    (acessíveis ou não), calculadas por deslocamentos em todas as direções.
+    Não supõe gravidade (serve também para matrizes arbitrárias).
+    """
+    r = 0
+    for d in (1, H, H - 1, H + 1):
+        # As 4 posições possíveis da casa vazia dentro da janela
+        t = (bits << d) & (bits << (2 * d))
+        r |= t & (bits << (3 * d))
+        r |= t & (bits >> d)
+        t = (bits >> d) & (bits >> (2 * d))
+        r |= t & (bits << d)
+        r |= t & (bits >> (3 * d))
+    return r & (BOARD_MASK ^ occupied)
+
+class Position:
+    """
+    Estado de jogo mutável em bitboard.
+
+    Mantém um bitboard por jogador (bits[P1], bits[P2]), a altura de cada
+    coluna e uma cópia do tabuleiro 6x7 (grid) atualizada no lugar, para que
+    a heurística continue recebendo o mesmo formato de matriz. play/undo são
+    O(1) e não alocam novos tabuleiros.
+
+    moves é o contador de plies (empate em O(1)) e history a pilha das colunas
+    jogadas desde a construção, usada para checar vitória só pela última peça.
+    mirror_bits são os bitboards da posição espelhada, mantidos junto para que
+    a chave canônica custe só uma comparação.
+    """
+    __slots__ = ("bits", "mirror_bits", "heights", "grid", "moves", "history")
+
+    def __init__(self) -> None:
+        self.bits = [0, 0, 0]  # índice 0 não usado (EMPTY)
+        self.mirror_bits = [0, 0, 0]
+        self.heights = [0] * COLS
+        self.grid = [[EMPTY] * COLS for _ in range(ROWS)]
+        self.moves = 0
+        self.history: List[int] = []
+
+    @classmethod
+    def from_board(cls, board: List[List[int]]) -> "Position":
+        """Constrói a posição a partir da matriz 6x7 usada pelo servidor."""
+        pos = cls()
+        for c in range(COLS):
+            for r in reversed(range(ROWS)):
+                p = board[r][c]
+                if p == EMPTY:
+                    break
+                pos.play(c, p)
+        # A ordem real das jogadas é desconhecida: sem histórico, terminal()
+        # faz a checagem completa na raiz
+        pos.history.clear()
+        return pos
+
+    def to_board(self) -> List[List[int]]:
+        return copy_board(self.grid)
+
+    def can_play(self, col: int) -> bool:
+        return self.heights[col] < ROWS
+
+    def valid_moves(self) -> List[int]:
+        heights = self.heights
+        return [c for c in range(COLS) if heights[c] < ROWS]
+
+    def ordered_moves(self) -> List[int]:
+        """Jogadas válidas já na ordem centro-primeiro (uma única lista por nó)."""
+        heights = self.heights
+        return [c for c in CENTER_ORDER if heights[c] < ROWS]
+
+    def play(self, col: int, player: int) -> None:
+        """Aplica a jogada no lugar (a coluna deve ser válida)."""
+        h = self.heights[col]
+        self.bits[player] |= 1 << (col * H + h)
+        self.mirror_bits[player] |= 1 << ((COLS - 1 - col) * H + h)
+        self.grid[ROWS - 1 - h][col] = player
+        self.heights[col] = h + 1
+        self.moves += 1
+        self.history.append(col)
+
+    def undo(self, col: int, player: int) -> None:
+        """Desfaz a última peça jogada na coluna col pelo jogador player."""
+        h = self.heights[col] - 1
+        self.bits[player] ^= 1 << (col * H + h)
+        self.mirror_bits[player] ^= 1 << ((COLS - 1 - col) * H + h)
+        self.grid[ROWS - 1 - h][col] = EMPTY
+        self.heights[col] = h
+        self.moves -= 1
+        self.history.pop()
+
+    def rewind(self, length: int) -> None:
+        """Desfaz as jogadas até o histórico voltar a ter length colunas."""
+        while len(self.history) > length:
+            col = self.history[-1]
+            self.undo(col, self.grid[ROWS - self.heights[col]][col])
+
+    def winner(self) -> int:
+        """Checagem completa (os dois jogadores, tabuleiro inteiro)."""
+        if has_four(self.bits[P1]):
+            return P1
+        if has_four(self.bits[P2]):
+            return P2
+        return 0
+
+    def last_move_winner(self) -> int:
+        """
+        Vencedor considerando só as janelas que passam pela última peça jogada:
+        só ela pode ter formado um 4 em linha. Sem histórico, cai na checagem
+        completa.
+        """
+        if not self.history:
+            return self.winner()
+        col = self.history[-1]
+        h = self.heights[col] - 1
+        p = self.grid[ROWS - 1 - h][col]
+        bits = self.bits[p]
+        for w in WINDOWS_BY_BIT[col * H + h]:
+            if bits & w == w:
+                return p
+        return 0
+
+    def is_full(self) -> bool:
+        return self.moves >= ROWS * COLS
+
+    def key(self) -> int:
+        """
+        Chave única da posição: bits[P1] + máscara de ocupação. Em cada coluna
+        a máscara é 2^h - 1, então a soma é injetiva (cabe em 49 bits).
+        """
+        p1 = self.bits[P1]
+        return p1 + (p1 | self.bits[P2])
+
+    def canonical_key(self) -> Tuple[int, bool]:
+        """
+        Menor entre a chave da posição e a da espelhada (coluna c <-> 6-c), e
+        se a espelhada foi a escolhida. As duas têm o mesmo valor, então
+        tabelas indexadas pela chave canônica guardam um só registro por par;
+        jogadas guardadas junto devem estar na orientação da chave (remapear
+        com COLS-1-col quando mirrored).
+        """
+        key = self.key()
+        m1 = self.mirror_bits[P1]
+        mirrored = m1 + (m1 | self.mirror_bits[P2])
+        if mirrored < key:
+            return mirrored, True
+        return key, False
+
+    def evaluate(self, player: int) -> float:
+        """evaluate(self.grid, player) calculado direto dos bitboards."""
+        return evaluate_bits(self.bits[player], self.bits[other(player)])
+
+    def terminal(self) -> Tuple[bool, int]:
+        """Mesmo contrato de terminal(board): vitória pela última jogada ou empate."""
+        w = self.last_move_winner()
+        if w != 0:
+            return True, w
+        if self.is_full():
+            return True, 0
+        return False, 0
+
+def as_position(board) -> Position:
+    """Aceita tanto a matriz 6x7 quanto uma Position já construída."""
+    if isinstance(board, Position):
+        return board
+    return Position.from_board(board)
+
+def threat_moves(pos: Position, player: int, moves: List[int],
+                 remaining: int) -> Tuple[int, List[int]]:
+    """
+    Filtra as jogadas de player usando as casas vencedoras de cada lado.
+
+    Retorna (status, jogadas):
+      - status 1: player vence agora; jogadas = [coluna vencedora]
+      - status -1: player perde à força (duas ameaças imediatas do oponente,
+        ou toda jogada entrega uma vitória imediata ao oponente)
+      - status 0: jogadas restritas ao bloqueio forçado, ou sem as jogadas
+        que caem logo abaixo de uma casa vencedora do oponente
+
+    Os cortes de derrota só são aplicados com remaining >= 2 plies, quando a
+    própria busca enxergaria a vitória do oponente: o valor minimax na
+    profundidade fixa não muda, só o número de nós.
+    """
+    occupied = pos.bits[P1] | pos.bits[P2]
+    playable = (occupied + BOTTOM_MASK) & BOARD_MASK
+    wins = winning_cells(pos.bits[player], occupied) & playable
+    if wins:
+        for c in moves:
+            if wins & COLUMN_MASKS[c]:
+                return 1, [c]
+    if remaining < 2:
+        return 0, moves
+    opp_wins = winning_cells(pos.bits[other(player)], occupied)
+    forced = opp_wins & playable
+    if forced:
+        if forced & (forced - 1):
+            return -1, moves  # duas ameaças imediatas: não dá para bloquear
+        return 0, [c for c in moves if forced & COLUMN_MASKS[c]]
+    # Não jogar logo abaixo de uma casa vencedora do oponente
+    under = (opp_wins >> 1) & playable
+    if under:
+        safe = [c for c in moves if not under & COLUMN_MASKS[c]]
+        if not safe:
+            return -1, moves
+        return 0, safe
+    return 0, moves
+
+# -----------------------------------------------------------------------------
+# Tabela de transposição
+# -----------------------------------------------------------------------------
+# Tipos de limite armazenados junto com o valor
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+def _prev_prime(n: int) -> int:
+    """Maior primo <= n (n >= 2)."""
+    def is_prime(k: int) -> bool:
+        if k < 4:
+            return k >= 2
+        if k % 2 == 0:
+            return False
+        d = 3
+        while d * d <= k:
+            if k % d == 0:
+                return False
+            d += 2
+        return True
+    while not is_prime(n):
+        n -= 1
+    return n
+
+class TranspositionTable:
+    """
+    Tabela de transposição de tamanho fixo, indexada pela chave de bitboard.
+
+    Cada bucket tem duas entradas: a primeira é preferida por profundidade
+    (só é substituída por buscas pelo menos tão profundas) e a segunda é
+    sempre substituída. Os campos ficam em arrays tipados, então a memória
+    total é limitada pelo orçamento em MB passado no construtor.
+
+    Os valores são guardados do ponto de vista de quem joga na posição, de
+    modo que uma entrada serve para buscas de qualquer um dos jogadores. As
+    buscas usam a chave canônica (Position.canonical_key): uma posição e sua
+    espelhada dividem a mesma entrada.
+    """
+    # chave (8) + valor (8) + profundidade (1) + limite (1) + jogada (1)
+    ENTRY_BYTES = 19
+
+    @classmethod
+    def bucket_count(cls, size_mb: float) -> int:
+        # Número primo de buckets: a chave de bitboard tem muita estrutura nos
+        # bits baixos e colide bastante módulo potências de 2
+        return _prev_prime(max(2, int(size_mb * 1024 * 1024) // (2 * cls.ENTRY_BYTES)))
+
+    def __init__(self, size_mb: float = 16.0) -> None:
+        self.buckets = self.bucket_count(size_mb)
+        n = 2 * self.buckets
+        self.keys = array('q', [-1]) * n
+        self.values = array('d', [0.0]) * n
+        self.depths = array('b', [0]) * n
+        self.flags = array('B', [0]) * n
+        self.moves = array('b', [-1]) * n
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    def clear(self) -> None:
+        self.keys[:] = array('q', [-1]) * len(self.keys)
+
+    def probe(self, key: int) -> int:
+        """Índice da entrada com esta chave, ou -1 se não houver."""
+        i = (key % self.buckets) * 2
+        keys = self.keys
+        if keys[i] == key:
+            self.hits += 1
+            return i
+        if keys[i + 1] == key:
+            self.hits += 1
+            return i + 1
+        self.misses += 1
+        if keys[i] != -1:
+            # Bucket ocupado por outra posição
+            self.collisions += 1
+        return -1
+
+    def store(self, key: int, depth: int, value: float, flag: int, move: int) -> None:
+        i = (key % self.buckets) * 2
+        keys = self.keys
+        if keys[i] == key or depth >= self.depths[i] or keys[i] == -1:
+            if keys[i] != key and keys[i] != -1:
+                # Rebaixa a entrada antiga para o slot de substituição sempre
+                self._write(i + 1, keys[i], self.depths[i], self.values[i],
+                            self.flags[i], self.moves[i])
+            self._write(i, key, depth, value, flag, move)
+        else:
+            self._write(i + 1, key, depth, value, flag, move)
+
+    def _write(self, i: int, key: int, depth: int, value: float, flag: int, move: int) -> None:
+        self.keys[i] = key
+        self.depths[i] = depth
+        self.values[i] = value
+        self.flags[i] = flag
+        self.moves[i] = move
+
+    def counters(self) -> Dict[str, int]:
+        return {'tt_hits': self.hits, 'tt_misses': self.misses,
+                'tt_collisions': self.collisions}
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    TranspositionTable cujos arrays vivem num bloco de memória compartilhada,
+    para que os processos da busca paralela usem a mesma tabela. O processo
+    que cria a tabela (name=None) é o dono e deve chamar unlink() no fim; os
+    processos filhos se conectam pelo nome e só chamam close().
+
+    Não há locks: cada escrita invalida a chave antes de gravar os campos e
+    grava a chave por último, então uma entrada incompleta nunca casa com uma
+    chave. Uma leitura ainda pode ser sobrescrita por outro processo entre o
+    probe e o uso dos campos; isso só piora a busca (valor de outra posição),
+    e a jogada da tabela é sempre validada antes de ser usada.
+    """
+
+    def __init__(self, size_mb: float = 16.0, name: Optional[str] = None) -> None:
+        self.size_mb = size_mb
+        self.buckets = self.bucket_count(size_mb)
+        n = 2 * self.buckets
+        self._shm = shared_memory.SharedMemory(name=name, create=name is None,
+                                               size=n * self.ENTRY_BYTES)
+        buf = self._shm.buf
+        self.keys = buf[0:8 * n].cast('q')
+        self.values = buf[8 * n:16 * n].cast('d')
+        self.depths = buf[16 * n:17 * n].cast('b')
+        self.flags = buf[17 * n:18 * n].cast('B')
+        self.moves = buf[18 * n:19 * n].cast('b')
+        if name is None:
+            self.clear()
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _write(self, i: int, key: int, depth: int, value: float, flag: int, move: int) -> None:
+        self.keys[i] = -1
+        self.depths[i] = depth
+        self.values[i] = value
+        self.flags[i] = flag
+        self.moves[i] = move
+        self.keys[i] = key
+
+    def close(self) -> None:
+        for view in (self.keys, self.values, self.depths, self.flags, self.moves):
+            view.release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Fecha e apaga o bloco (só o dono)."""
+        self.close()
+        self._shm.unlink()
+
 # -----------------------------------------------------------------------------
 # ÚNICO PONTO A SER IMPLEMENTADO PELOS ALUNOS
 # -----------------------------------------------------------------------------
@@ -162,77 +609,232 @@ def evaluate(board: List[List[int]], player: int) -> float:
     1. Valorização do centro (colunas centrais são mais valiosas)
     2. Contagem de sequências (duplas e triplas)
     3. Detecção de ameaças (3 em linha que podem virar 4)
+
+    Pesos: centro 3 (coluna 3) e 2 (colunas 2 e 4), duplas 1, triplas 10,
+    ameaças próprias +500 e do oponente -1000. O cálculo é feito sobre
+    bitboards por evaluate_bits.
     """
-    opponent = other(player)
-    score = 0.0
-    
-    # 1. Valorização do centro
-    # Colunas centrais (2, 3, 4) são mais valiosas
-    center_cols = [2, 3, 4]
-    for c in center_cols:
-        for r in range(ROWS):
-            if board[r][c] == player:
-                # Quanto mais central, mais pontos
-                if c == 3:  # Coluna central
-                    score += 3.0
-                else:  # Colunas 2 e 4
-                    score += 2.0
-            elif board[r][c] == opponent:
-                # Penalizar peças do oponente no centro
-                if c == 3:
-                    score -= 3.0
-                else:
-                    score -= 2.0
-    
-    # 2. Contagem de sequências
-    # Contar sequências de 2 e 3 peças do jogador
-    def count_sequences(length: int, p: int) -> int:
-        """Conta sequências de 'length' peças do jogador p."""
-        count = 0
-        # Horizontais
-        for r in range(ROWS):
-            for c in range(COLS - length + 1):
-                seq = [board[r][c+i] for i in range(length)]
-                if seq.count(p) == length and seq.count(EMPTY) == 0:
-                    count += 1
-        # Verticais
+    b1, b2 = grid_bits(board)
+    if player == P1:
+        return evaluate_bits(b1, b2)
+    return evaluate_bits(b2, b1)
+
+# -----------------------------------------------------------------------------
+# Avaliação sobre bitboards (mesmos valores de evaluate, sem listas)
+# -----------------------------------------------------------------------------
+
+CENTER_MASK = COLUMN_MASKS[3]
+NEAR_CENTER_MASK = COLUMN_MASKS[2] | COLUMN_MASKS[4]
+# Direções de uma linha: vertical, horizontal e as duas diagonais
+LINE_SHIFTS = (1, H, H + 1, H - 1)
+
+def popcount(x: int) -> int:
+    return bin(x).count("1")
+
+def grid_bits(board: List[List[int]]) -> Tuple[int, int]:
+    """Bitboards (P1, P2) de uma matriz 6x7 (não exige gravidade)."""
+    b1 = b2 = 0
+    for r in range(ROWS):
+        row = board[r]
+        y = ROWS - 1 - r
         for c in range(COLS):
-            for r in range(ROWS - length + 1):
-                seq = [board[r+i][c] for i in range(length)]
-                if seq.count(p) == length and seq.count(EMPTY) == 0:
-                    count += 1
-        # Diagonais ↘
-        for r in range(ROWS - length + 1):
-            for c in range(COLS - length + 1):
-                seq = [board[r+i][c+i] for i in range(length)]
-                if seq.count(p) == length and seq.count(EMPTY) == 0:
-                    count += 1
-        # Diagonais ↗
-        for r in range(length - 1, ROWS):
-            for c in range(COLS - length + 1):
-                seq = [board[r-i][c+i] for i in range(length)]
-                if seq.count(p) == length and seq.count(EMPTY) == 0:
-                    count += 1
-        return count
-    
-    # Sequências de 2 peças: peso 1
-    score += count_sequences(2, player) * 1.0
-    score -= count_sequences(2, opponent) * 1.0
-    
-    # Sequências de 3 peças: peso 10 (muito mais importante)
-    score += count_sequences(3, player) * 10.0
-    score -= count_sequences(3, opponent) * 10.0
-    
-    # 3. Detecção de ameaças (3 em linha que podem virar 4)
-    # Ameaças próprias: peso muito alto (500) - oportunidade de vitória
-    my_threats = count_threats(board, player)
-    score += my_threats * 500.0
-    
-    # Ameaças do oponente: peso muito alto negativo (1000) - precisa bloquear
-    opponent_threats = count_threats(board, opponent)
-    score -= opponent_threats * 1000.0
-    
-    return score
+            v = row[c]
+            if v == P1:
+                b1 |= 1 << (c * H + y)
+            elif v == P2:
+                b2 |= 1 << (c * H + y)
+    return b1, b2
+
+def evaluate_bits(mine: int, theirs: int) -> float:
+    """
+    evaluate() calculado direto dos bitboards, do ponto de vista de mine.
+
+    - centro: contagem de peças nas máscaras das colunas centrais;
+    - sequências de 2 e 3: p & (p >> d) [& (p >> 2d)] marca o início de cada
+      janela cheia na direção d (a linha sentinela de cada coluna impede que
+      uma janela atravesse a borda), então cada bit é uma janela;
+    - ameaças: as janelas de 4 (tabela WINDOWS_BY_BIT) que passam por uma
+      casa vazia acessível e têm as outras 3 casas do mesmo jogador.
+    """
+    score = 3.0 * (popcount(mine & CENTER_MASK) - popcount(theirs & CENTER_MASK))
+    score += 2.0 * (popcount(mine & NEAR_CENTER_MASK) - popcount(theirs & NEAR_CENTER_MASK))
+
+    for d in LINE_SHIFTS:
+        m2 = mine & (mine >> d)
+        t2 = theirs & (theirs >> d)
+        score += popcount(m2) - popcount(t2)
+        score += 10.0 * (popcount(m2 & (mine >> (2 * d))) - popcount(t2 & (theirs >> (2 * d))))
+
+    # Casas vazias acessíveis (linha de baixo ou com peça logo abaixo) que
+    # completam alguma janela; só elas podem ter ameaças
+    occupied = mine | theirs
+    accessible = (BOARD_MASK ^ occupied) & (BOTTOM_MASK | (occupied << 1))
+    accessible &= winning_cells(mine, occupied) | winning_cells(theirs, occupied)
+    my_threats = their_threats = 0
+    while accessible:
+        cell = accessible & -accessible
+        accessible ^= cell
+        for w in WINDOWS_BY_BIT[cell.bit_length() - 1]:
+            rest = w ^ cell
+            if mine & rest == rest:
+                my_threats += 1
+            elif theirs & rest == rest:
+                their_threats += 1
+    return score + my_threats * 500.0 - their_threats * 1000.0
+
+# -----------------------------------------------------------------------------
+# Avaliação incremental
+# -----------------------------------------------------------------------------
+
+def _build_neighbors_by_bit() -> List[int]:
+    """
+    Uma janela de 2 pela casa é a casa mais um vizinho: basta a máscara dos
+    vizinhos (nas 8 direções) para contar as duplas que uma peça completa.
+    """
+    by_bit = []
+    for b, windows in enumerate(_build_windows_by_bit(_build_windows(2))):
+        mask = 0
+        for w in windows:
+            mask |= w
+        by_bit.append(mask & ~(1 << b))
+    return by_bit
+
+NEIGHBORS_BY_BIT = _build_neighbors_by_bit()
+WINDOWS_3_BY_BIT = _build_windows_by_bit(_build_windows(3))
+
+def _build_above_windows_by_bit() -> List[Tuple[int, ...]]:
+    """
+    Janelas de 4 que passam pela casa de cima mas não pela casa: ao ocupar a
+    casa, a de cima passa a ser acessível e pode virar ameaça nessas janelas.
+    """
+    by_bit = []
+    for b in range(COLS * H):
+        windows: Tuple[int, ...] = ()
+        if b % H < ROWS - 1:
+            windows = tuple(w for w in WINDOWS_BY_BIT[b + 1] if not w >> b & 1)
+        by_bit.append(windows)
+    return by_bit
+
+ABOVE_WINDOWS_BY_BIT = _build_above_windows_by_bit()
+# Bônus de centro de uma peça em cada coluna
+CENTER_WEIGHTS = (0, 0, 2, 3, 2, 0, 0)
+
+class IncrementalPosition(Position):
+    """
+    Position que mantém os termos da heurística por jogador e atualiza só o
+    que a jogada muda, em vez de reavaliar o tabuleiro nas folhas.
+
+    terms[p] = [bônus de centro, duplas, triplas, ameaças]. Cada play soma as
+    janelas de 2 e 3 que a peça completa e revê as ameaças só nas janelas que
+    passam pela casa ou pela casa de cima; os deltas vão para uma pilha, então
+    undo é O(1).
+
+    Com debug=True, cada play, undo e avaliação confere o valor incremental
+    com evaluate(grid, player) e levanta AssertionError na divergência.
+    """
+    __slots__ = ("terms", "deltas", "debug")
+
+    def __init__(self, debug: bool = False) -> None:
+        super().__init__()
+        self.terms = [[0, 0, 0, 0] for _ in range(3)]  # índice 0 não usado
+        self.deltas: List[Tuple[int, int, int, int]] = []
+        self.debug = debug
+
+    def play(self, col: int, player: int) -> None:
+        b = col * H + self.heights[col]
+        cell = 1 << b
+        mine = self.bits[player]
+        theirs = self.bits[other(player)]
+        twos = popcount(mine & NEIGHBORS_BY_BIT[b])
+        threes = 0
+        for w in WINDOWS_3_BY_BIT[b]:
+            if mine & w == w ^ cell:
+                threes += 1
+
+        # Ameaças nas janelas que passam pela casa: a casa era a vazia
+        # acessível de uma ameaça (que deixa de existir), ou a janela vira
+        # ameaça de player com outra casa vazia acessível
+        occupied = mine | theirs | cell
+        playable = (occupied + BOTTOM_MASK) & BOARD_MASK
+        d_mine = d_theirs = 0
+        for w in WINDOWS_BY_BIT[b]:
+            rest = w ^ cell
+            if mine & rest == rest:
+                d_mine -= 1
+            elif theirs & rest == rest:
+                d_theirs -= 1
+            else:
+                empty = rest ^ (rest & occupied)
+                if empty & playable and not empty & (empty - 1) and mine & rest == rest ^ empty:
+                    d_mine += 1
+        # A casa de cima fica acessível: ameaças que dependiam dela passam a contar
+        above = cell << 1
+        for w in ABOVE_WINDOWS_BY_BIT[b]:
+            rest = w ^ above
+            if mine & rest == rest:
+                d_mine += 1
+            elif theirs & rest == rest:
+                d_theirs += 1
+
+        super().play(col, player)
+        d1, d2 = (d_mine, d_theirs) if player == P1 else (d_theirs, d_mine)
+        terms = self.terms[player]
+        terms[0] += CENTER_WEIGHTS[col]
+        terms[1] += twos
+        terms[2] += threes
+        self.terms[P1][3] += d1
+        self.terms[P2][3] += d2
+        self.deltas.append((twos, threes, d1, d2))
+        if self.debug:
+            self.check()
+
+    def undo(self, col: int, player: int) -> None:
+        twos, threes, d1, d2 = self.deltas.pop()
+        terms = self.terms[player]
+        terms[0] -= CENTER_WEIGHTS[col]
+        terms[1] -= twos
+        terms[2] -= threes
+        self.terms[P1][3] -= d1
+        self.terms[P2][3] -= d2
+        super().undo(col, player)
+        if self.debug:
+            self.check()
+
+    def evaluate(self, player: int) -> float:
+        mine = self.terms[player]
+        theirs = self.terms[other(player)]
+        score = float((mine[0] - theirs[0]) + (mine[1] - theirs[1])
+                      + 10 * (mine[2] - theirs[2])
+                      + 500 * mine[3] - 1000 * theirs[3])
+        if self.debug:
+            full = evaluate(self.grid, player)
+            if score != full:
+                raise AssertionError(f"Avaliação incremental {score} != {full} (jogador {player})")
+        return score
+
+    def check(self) -> None:
+        """Confere os dois pontos de vista contra a avaliação completa."""
+        self.evaluate(P1)
+        self.evaluate(P2)
+
+# Modos de avaliação selecionáveis por config["eval"]
+EVAL_MODES = {
+    "full": Position,
+    "incremental": IncrementalPosition,
+    "debug": IncrementalPosition,
+}
+
+DEFAULT_EVAL = "full"
+
+def make_position(board: List[List[int]], mode: str = "full") -> Position:
+    """Constrói a Position da raiz para o modo de avaliação (ver EVAL_MODES)."""
+    if mode not in EVAL_MODES:
+        raise ValueError(f"Modo de avaliação desconhecido: {mode}")
+    pos = EVAL_MODES[mode].from_board(board)
+    if mode == "debug":
+        pos.debug = True
+        pos.check()
+    return pos
 
 def order_moves(board: List[List[int]], moves: List[int], player: int) -> List[int]:
     """
@@ -246,18 +848,112 @@ def order_moves(board: List[List[int]], moves: List[int], player: int) -> List[i
     
     return sorted(moves, key=move_score, reverse=True)
 
-def minimax(board: List[List[int]], depth: int, max_depth: int, player: int, 
+class MoveOrdering:
+    """
+    Ordenação dinâmica de jogadas para a poda Alfa-Beta.
+
+    - killers: por ply, as duas últimas jogadas que causaram poda naquele nível
+      são tentadas logo depois da jogada da tabela de transposição;
+    - histórico: cada (jogador, casa) acumula profundidade_restante² a cada
+      poda; as demais jogadas são ordenadas por esse valor, com o centro como
+      desempate.
+
+    A mesma instância é reaproveitada entre as iterações do aprofundamento
+    iterativo, então o que foi aprendido numa profundidade guia a seguinte.
+    """
+    MAX_PLY = ROWS * COLS + 1
+
+    def __init__(self, use_killers: bool = True, use_history: bool = True) -> None:
+        self.use_killers = use_killers
+        self.use_history = use_history
+        self.killers = [[-1, -1] for _ in range(self.MAX_PLY)]
+        # Índice: player * COLS * H + bit da casa
+        self.history = [0] * (3 * COLS * H)
+
+    def order(self, pos: Position, moves: List[int], depth: int, player: int,
+              hash_move: int = -1) -> List[int]:
+        """moves já vem na ordem centro-primeiro; devolve a nova ordem."""
+        if self.use_history:
+            heights = pos.heights
+            history = self.history
+            base = player * COLS * H
+            moves.sort(key=lambda c: -history[base + c * H + heights[c]])
+        if self.use_killers:
+            for k in reversed(self.killers[depth]):
+                if k >= 0 and k != hash_move and k in moves:
+                    moves.remove(k)
+                    moves.insert(0, k)
+        if hash_move >= 0 and hash_move in moves and moves[0] != hash_move:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+        return moves
+
+    def cutoff(self, pos: Position, col: int, depth: int, player: int,
+               remaining: int) -> None:
+        """Registra que col causou poda (pos já com a jogada desfeita)."""
+        if self.use_killers:
+            slot = self.killers[depth]
+            if slot[0] != col:
+                slot[1] = slot[0]
+                slot[0] = col
+        if self.use_history:
+            self.history[player * COLS * H + col * H + pos.heights[col]] += remaining * remaining
+
+# Políticas selecionáveis por config["ordering"]
+ORDERINGS = {
+    "center": None,                       # só centro primeiro (+ jogada da tabela)
+    "killers": (True, False),
+    "history": (False, True),
+    "killers_history": (True, True),
+}
+
+DEFAULT_ORDERING = "history"
+
+def make_ordering(name: str) -> Optional[MoveOrdering]:
+    """Cria a política de ordenação pelo nome (ver ORDERINGS)."""
+    if name not in ORDERINGS:
+        raise ValueError(f"Ordenação desconhecida: {name}")
+    flags = ORDERINGS[name]
+    if flags is None:
+        return None
+    return MoveOrdering(*flags)
+
+def _record_cutoff(stats: Dict, index: int, ordering: Optional[MoveOrdering],
+                   pos: Position, col: int, depth: int, player: int,
+                   remaining: int) -> None:
+    """Contabiliza uma poda causada pela index-ésima jogada tentada."""
+    stats['pruned'] = stats.get('pruned', 0) + 1
+    # Jogadas tentadas até a poda (1 = a primeira já cortou)
+    stats['cutoff_moves_tried'] = stats.get('cutoff_moves_tried', 0) + index + 1
+    if index == 0:
+        stats['first_move_cutoffs'] = stats.get('first_move_cutoffs', 0) + 1
+    if ordering is not None:
+        ordering.cutoff(pos, col, depth, player, remaining)
+
+# Nós entre consultas ao relógio dentro da busca (time.time() a cada nó custaria
+# mais que a própria avaliação)
+TIME_CHECK_NODES = 256
+
+class SearchTimeout(Exception):
+    """Tempo esgotado no meio da busca (lançada a partir de time_exceeded)."""
+
+def minimax(board, depth: int, max_depth: int, player: int,
             is_maximizing: bool, stats: Dict) -> float:
     """
     Algoritmo Minimax com profundidade limitada.
     
     Retorna o valor da posição do ponto de vista do jogador maximizador.
     stats é um dicionário mutável para contar estados visitados.
+    board pode ser a matriz 6x7 ou uma Position (a busca roda sobre bitboards).
     """
+    return _minimax(as_position(board), depth, max_depth, player, is_maximizing, stats)
+
+def _minimax(pos: Position, depth: int, max_depth: int, player: int,
+             is_maximizing: bool, stats: Dict) -> float:
     stats['nodes_visited'] = stats.get('nodes_visited', 0) + 1
     
     # Verificar estado terminal
-    is_terminal, winner_player = terminal(board)
+    is_terminal, winner_player = pos.terminal()
     if is_terminal:
         if winner_player == player:
             return float('inf')  # Vitória do jogador
@@ -269,40 +965,40 @@ def minimax(board: List[List[int]], depth: int, max_depth: int, player: int,
     # Se atingiu profundidade máxima, usar heurística
     if depth >= max_depth:
         if is_maximizing:
-            return evaluate(board, player)
+            return pos.evaluate(player)
         else:
-            return -evaluate(board, other(player))
+            return -pos.evaluate(other(player))
     
-    # Obter jogadas válidas e ordená-las
-    legal_moves = valid_moves(board)
-    if not legal_moves:
+    # Obter jogadas válidas já ordenadas: colunas centrais primeiro
+    ordered_moves = pos.ordered_moves()
+    if not ordered_moves:
         return 0.0  # Sem jogadas (empate)
     
-    # Ordenar jogadas: colunas centrais primeiro
-    ordered_moves = order_moves(board, legal_moves, player)
-    
     if is_maximizing:
         # Maximizador: escolhe o maior valor
         max_value = float('-inf')
         for col in ordered_moves:
-            new_board = make_move(board, col, player)
-            if new_board is not None:
-                value = minimax(new_board, depth + 1, max_depth, player, False, stats)
-                max_value = max(max_value, value)
+            pos.play(col, player)
+            value = _minimax(pos, depth + 1, max_depth, player, False, stats)
+            pos.undo(col, player)
+            max_value = max(max_value, value)
         return max_value
     else:
         # Minimizador: escolhe o menor valor
         min_value = float('inf')
         opponent = other(player)
         for col in ordered_moves:
-            new_board = make_move(board, col, opponent)
-            if new_board is not None:
-                value = minimax(new_board, depth + 1, max_depth, player, True, stats)
-                min_value = min(min_value, value)
+            pos.play(col, opponent)
+            value = _minimax(pos, depth + 1, max_depth, player, True, stats)
+            pos.undo(col, opponent)
+            min_value = min(min_value, value)
         return min_value
 
-def minimax_alphabeta(board: List[List[int]], depth: int, max_depth: int, player: int, 
-                     is_maximizing: bool, alpha: float, beta: float, stats: Dict) -> float:
+def minimax_alphabeta(board, depth: int, max_depth: int, player: int,
+                     is_maximizing: bool, alpha: float, beta: float, stats: Dict,
+                     tt: Optional[TranspositionTable] = None,
+                     ordering: Optional["MoveOrdering"] = None,
+                     time_exceeded=None) -> float:
     """
     Algoritmo Minimax com poda Alfa-Beta.
     
@@ -310,11 +1006,27 @@ def minimax_alphabeta(board: List[List[int]], depth: int, max_depth: int, player
     stats é um dicionário mutável para contar estados visitados.
     alpha: melhor valor que o maximizador pode garantir
     beta: melhor valor que o minimizador pode garantir
+    board pode ser a matriz 6x7 ou uma Position (a busca roda sobre bitboards).
+    tt: tabela de transposição opcional (reaproveita subárvores já buscadas)
+    ordering: política de ordenação (killers/histórico); None = centro primeiro
+    time_exceeded: consultado a cada TIME_CHECK_NODES nós; se retornar True a
+    busca é abandonada com SearchTimeout (board, se for Position, fica no
+    meio da variação: ver Position.rewind)
     """
-    stats['nodes_visited'] = stats.get('nodes_visited', 0) + 1
+    return _alphabeta(as_position(board), depth, max_depth, player,
+                      is_maximizing, alpha, beta, stats, tt, ordering, time_exceeded)
+
+def _alphabeta(pos: Position, depth: int, max_depth: int, player: int,
+               is_maximizing: bool, alpha: float, beta: float, stats: Dict,
+               tt: Optional[TranspositionTable] = None,
+               ordering: Optional["MoveOrdering"] = None,
+               time_exceeded=None) -> float:
+    nodes = stats['nodes_visited'] = stats.get('nodes_visited', 0) + 1
+    if time_exceeded is not None and nodes % TIME_CHECK_NODES == 0 and time_exceeded():
+        raise SearchTimeout()
     
     # Verificar estado terminal
-    is_terminal, winner_player = terminal(board)
+    is_terminal, winner_player = pos.terminal()
     if is_terminal:
         if winner_player == player:
             return float('inf')  # Vitória do jogador
@@ -326,151 +1038,1236 @@ def minimax_alphabeta(board: List[List[int]], depth: int, max_depth: int, player
     # Se atingiu profundidade máxima, usar heurística
     if depth >= max_depth:
         if is_maximizing:
-            return evaluate(board, player)
+            return pos.evaluate(player)
         else:
-            return -evaluate(board, other(player))
+            return -pos.evaluate(other(player))
     
-    # Obter jogadas válidas e ordená-las (melhora a poda Alfa-Beta)
-    legal_moves = valid_moves(board)
-    if not legal_moves:
+    # Obter jogadas válidas já ordenadas (melhora a poda Alfa-Beta):
+    # colunas centrais primeiro, sem lista intermediária nem sorted() por nó
+    ordered_moves = pos.ordered_moves()
+    if not ordered_moves:
         return 0.0  # Sem jogadas (empate)
     
-    # Ordenar jogadas: colunas centrais primeiro
-    ordered_moves = order_moves(board, legal_moves, player)
+    # Ameaças imediatas: vitória em um lance, bloqueio forçado, jogadas suicidas
+    mover = player if is_maximizing else other(player)
+    status, ordered_moves = threat_moves(pos, mover, ordered_moves, max_depth - depth)
+    if status != 0:
+        mover_wins = status == 1
+        return float('inf') if mover_wins == is_maximizing else float('-inf')
+    
+    # Consultar a tabela de transposição
+    hash_move = -1
+    if tt is not None:
+        key, mirrored = pos.canonical_key()
+        slot = tt.probe(key)
+        if slot >= 0:
+            if tt.depths[slot] >= max_depth - depth:
+                # A tabela guarda do ponto de vista de quem joga: converter
+                value, flag = tt.values[slot], tt.flags[slot]
+                if not is_maximizing:
+                    value = -value
+                    if flag != TT_EXACT:
+                        flag = TT_LOWER + TT_UPPER - flag
+                if flag == TT_EXACT:
+                    return value
+                if flag == TT_LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if beta <= alpha:
+                    return value
+            hash_move = tt.moves[slot]
+            if mirrored and hash_move >= 0:
+                hash_move = COLS - 1 - hash_move
+        window_alpha, window_beta = alpha, beta
+    
+    # Ordenação: jogada da tabela primeiro, depois a política configurada
+    if ordering is not None:
+        ordered_moves = ordering.order(pos, ordered_moves, depth, mover, hash_move)
+    elif hash_move >= 0 and hash_move in ordered_moves and ordered_moves[0] != hash_move:
+        ordered_moves.remove(hash_move)
+        ordered_moves.insert(0, hash_move)
     
+    best_move = ordered_moves[0]
     if is_maximizing:
         # Maximizador: escolhe o maior valor
         max_value = float('-inf')
-        for col in ordered_moves:
-            new_board = make_move(board, col, player)
-            if new_board is not None:
-                value = minimax_alphabeta(new_board, depth + 1, max_depth, player, 
-                                        False, alpha, beta, stats)
-                max_value = max(max_value, value)
-                alpha = max(alpha, max_value)
-                
-                # Poda Beta: se o valor é maior que beta, o minimizador não escolherá este caminho
-                if beta <= alpha:
-                    stats['pruned'] = stats.get('pruned', 0) + 1
-                    break  # Poda: não precisa explorar mais
-        return max_value
+        for i, col in enumerate(ordered_moves):
+            pos.play(col, player)
+            value = _alphabeta(pos, depth + 1, max_depth, player,
+                               False, alpha, beta, stats, tt, ordering, time_exceeded)
+            pos.undo(col, player)
+            if value > max_value:
+                max_value = value
+                best_move = col
+            alpha = max(alpha, max_value)
+            
+            # Poda Beta: se o valor é maior que beta, o minimizador não escolherá este caminho
+            if beta <= alpha:
+                _record_cutoff(stats, i, ordering, pos, col, depth, mover, max_depth - depth)
+                break  # Poda: não precisa explorar mais
+        result = max_value
     else:
         # Minimizador: escolhe o menor valor
         min_value = float('inf')
         opponent = other(player)
-        for col in ordered_moves:
-            new_board = make_move(board, col, opponent)
-            if new_board is not None:
-                value = minimax_alphabeta(new_board, depth + 1, max_depth, player, 
-                                        True, alpha, beta, stats)
-                min_value = min(min_value, value)
-                beta = min(beta, min_value)
-                
-                # Poda Alfa: se o valor é menor que alpha, o maximizador não escolherá este caminho
+        for i, col in enumerate(ordered_moves):
+            pos.play(col, opponent)
+            value = _alphabeta(pos, depth + 1, max_depth, player,
+                               True, alpha, beta, stats, tt, ordering, time_exceeded)
+            pos.undo(col, opponent)
+            if value < min_value:
+                min_value = value
+                best_move = col
+            beta = min(beta, min_value)
+            
+            # Poda Alfa: se o valor é menor que alpha, o maximizador não escolherá este caminho
+            if beta <= alpha:
+                _record_cutoff(stats, i, ordering, pos, col, depth, mover, max_depth - depth)
+                break  # Poda: não precisa explorar mais
+        result = min_value
+    
+    # Guardar na tabela: o tipo de limite depende da janela efetivamente buscada
+    if tt is not None:
+        if result <= window_alpha:
+            flag = TT_UPPER
+        elif result >= window_beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        stored_move = COLS - 1 - best_move if mirrored else best_move
+        if not is_maximizing:
+            tt.store(key, max_depth - depth, -result,
+                     flag if flag == TT_EXACT else TT_LOWER + TT_UPPER - flag, stored_move)
+        else:
+            tt.store(key, max_depth - depth, result, flag, stored_move)
+    return result
+
+# Meia-largura da janela de aspiração (em unidades da heurística): uma ameaça
+# própria vale 500, então janelas menores falham quase toda iteração
+ASPIRATION_WINDOW = 500.0
+
+def pvs(board, depth: int, max_depth: int, player: int, alpha: float, beta: float,
+        stats: Dict, tt: Optional[TranspositionTable] = None,
+        ordering: Optional["MoveOrdering"] = None, time_exceeded=None) -> float:
+    """
+    Negamax com Principal Variation Search (NegaScout).
+
+    Diferente de minimax_alphabeta, o valor é sempre do ponto de vista de
+    player, o jogador que joga em board. A primeira jogada de cada nó é
+    buscada com a janela inteira e as demais com janela nula (alpha, alpha+1),
+    refazendo a busca só quando a janela nula falha alto. Como a heurística só
+    produz valores inteiros, a janela nula de largura 1 é exata.
+    time_exceeded: como em minimax_alphabeta
+    """
+    return _pvs(as_position(board), depth, max_depth, player, alpha, beta, stats,
+                tt, ordering, time_exceeded)
+
+def _pvs(pos: Position, depth: int, max_depth: int, player: int,
+         alpha: float, beta: float, stats: Dict,
+         tt: Optional[TranspositionTable] = None,
+         ordering: Optional["MoveOrdering"] = None,
+         time_exceeded=None) -> float:
+    nodes = stats['nodes_visited'] = stats.get('nodes_visited', 0) + 1
+    if time_exceeded is not None and nodes % TIME_CHECK_NODES == 0 and time_exceeded():
+        raise SearchTimeout()
+
+    # Verificar estado terminal
+    is_terminal, winner_player = pos.terminal()
+    if is_terminal:
+        if winner_player == player:
+            return float('inf')
+        elif winner_player != 0:
+            return float('-inf')
+        return 0.0
+
+    # Folha: heurística do ponto de vista de quem joga
+    if depth >= max_depth:
+        return pos.evaluate(player)
+
+    ordered_moves = pos.ordered_moves()
+    if not ordered_moves:
+        return 0.0
+
+    # Ameaças imediatas: vitória em um lance, bloqueio forçado, jogadas suicidas
+    status, ordered_moves = threat_moves(pos, player, ordered_moves, max_depth - depth)
+    if status != 0:
+        return float('inf') if status == 1 else float('-inf')
+    
+    # Consultar a tabela de transposição (já guarda do ponto de vista de quem joga)
+    hash_move = -1
+    if tt is not None:
+        key, mirrored = pos.canonical_key()
+        slot = tt.probe(key)
+        if slot >= 0:
+            if tt.depths[slot] >= max_depth - depth:
+                value, flag = tt.values[slot], tt.flags[slot]
+                if flag == TT_EXACT:
+                    return value
+                if flag == TT_LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
                 if beta <= alpha:
-                    stats['pruned'] = stats.get('pruned', 0) + 1
-                    break  # Poda: não precisa explorar mais
-        return min_value
+                    return value
+            hash_move = tt.moves[slot]
+            if mirrored and hash_move >= 0:
+                hash_move = COLS - 1 - hash_move
+        window_alpha, window_beta = alpha, beta
+    
+    # Ordenação: jogada da tabela primeiro, depois a política configurada
+    if ordering is not None:
+        ordered_moves = ordering.order(pos, ordered_moves, depth, player, hash_move)
+    elif hash_move >= 0 and hash_move in ordered_moves and ordered_moves[0] != hash_move:
+        ordered_moves.remove(hash_move)
+        ordered_moves.insert(0, hash_move)
+
+    opponent = other(player)
+    best_value = float('-inf')
+    best_move = ordered_moves[0]
+    first = True
+    for i, col in enumerate(ordered_moves):
+        pos.play(col, player)
+        if first or alpha == float('-inf'):
+            # Variação principal: janela inteira
+            value = -_pvs(pos, depth + 1, max_depth, opponent, -beta, -alpha, stats,
+                          tt, ordering, time_exceeded)
+        else:
+            # Janela nula: só prova que a jogada não supera alpha
+            value = -_pvs(pos, depth + 1, max_depth, opponent, -alpha - 1, -alpha, stats,
+                          tt, ordering, time_exceeded)
+            if alpha < value < beta:
+                stats['pvs_researches'] = stats.get('pvs_researches', 0) + 1
+                value = -_pvs(pos, depth + 1, max_depth, opponent, -beta, -alpha, stats,
+                              tt, ordering, time_exceeded)
+        pos.undo(col, player)
+        first = False
 
-def choose_move(board: List[List[int]], turn: int, config: Dict) -> Tuple[int, Dict]:
+        if value > best_value:
+            best_value = value
+            best_move = col
+        alpha = max(alpha, value)
+        if beta <= alpha:
+            _record_cutoff(stats, i, ordering, pos, col, depth, player, max_depth - depth)
+            break
+
+    if tt is not None:
+        if best_value <= window_alpha:
+            flag = TT_UPPER
+        elif best_value >= window_beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        tt.store(key, max_depth - depth, best_value, flag,
+                 COLS - 1 - best_move if mirrored else best_move)
+    return best_value
+
+def _search_root(pos: Position, turn: int, max_depth: int, root_moves: List[int],
+                 alpha: float, beta: float, stats: Dict,
+                 tt: Optional[TranspositionTable], algorithm: str,
+                 time_exceeded, ordering: Optional["MoveOrdering"] = None) -> Tuple[float, int, int]:
     """
-    Decide a coluna (0..6) para jogar agora.
+    Uma iteração do aprofundamento iterativo na raiz. Retorna
+    (melhor valor, melhor jogada, jogadas buscadas) do ponto de vista de turn.
+
+    time_exceeded (ou None) é consultado entre as jogadas e, a cada
+    TIME_CHECK_NODES nós, dentro da busca. Se o tempo acabar, a posição volta
+    à raiz e o resultado vale só para as jogadas buscadas por inteiro (as
+    primeiras "jogadas buscadas" de root_moves).
+    """
+    best_value = float('-inf')
+    best_move = root_moves[0]
+    first = True
+    searched = 0
+    length = len(pos.history)
+    try:
+        for col in root_moves:
+            if time_exceeded is not None and time_exceeded():
+                break
+
+            pos.play(col, turn)
+            if algorithm == "pvs":
+                if first or alpha == float('-inf'):
+                    value = -_pvs(pos, 1, max_depth, other(turn), -beta, -alpha, stats,
+                                  tt, ordering, time_exceeded)
+                else:
+                    value = -_pvs(pos, 1, max_depth, other(turn), -alpha - 1, -alpha, stats,
+                                  tt, ordering, time_exceeded)
+                    if alpha < value < beta:
+                        stats['pvs_researches'] = stats.get('pvs_researches', 0) + 1
+                        value = -_pvs(pos, 1, max_depth, other(turn), -beta, -alpha, stats,
+                                      tt, ordering, time_exceeded)
+            else:
+                # Avaliar esta jogada com Minimax Alfa-Beta na profundidade atual
+                value = _alphabeta(pos, depth=1, max_depth=max_depth,
+                                   player=turn, is_maximizing=False,
+                                   alpha=alpha, beta=beta, stats=stats, tt=tt,
+                                   ordering=ordering, time_exceeded=time_exceeded)
+            pos.undo(col, turn)
+            first = False
+            searched += 1
+
+            if value > best_value:
+                best_value = value
+                best_move = col
+
+            # Atualizar alpha
+            alpha = max(alpha, best_value)
+    except SearchTimeout:
+        # Abandona a jogada em andamento: nada dela foi guardado na tabela
+        pos.rewind(length)
+    return best_value, best_move, searched
+
+# -----------------------------------------------------------------------------
+# Resolvedor exato de finais
+# -----------------------------------------------------------------------------
+
+# Casas vazias a partir das quais choose_move resolve a posição de forma exata
+DEFAULT_SOLVER_EMPTY = 16
+# Fração de max_time_ms que o resolvedor pode usar; o resto fica para a busca
+# heurística se ele não terminar
+SOLVER_TIME_FRACTION = 0.5
+
+class SolverTimeout(Exception):
+    """Busca exata interrompida pelo limite de tempo."""
+
+class EndgameSolver:
+    """
+    Resolve a posição de forma exata (sem heurística nem limite de
+    profundidade).
+
+    Negamax com janela nula sobre a posição compacta (bits de quem joga,
+    máscara de ocupação, e os mesmos dois valores espelhados para a chave
+    canônica), só com as jogadas que não entregam vitória imediata, ordenadas
+    pelo número de casas vencedoras que criam. A tabela de transposição
+    guarda limites superiores; solve() estreita a janela [min, max] por busca
+    binária com janelas nulas até o valor exato.
+
+    Pontuação, do ponto de vista de quem joga: 0 é empate; positiva é vitória,
+    valendo (43 - n) // 2 para a vitória com a peça jogada quando há n peças
+    no tabuleiro (vencer mais cedo vale mais); negativa é derrota.
+    """
+    NODE_CHECK = TIME_CHECK_NODES  # nós entre consultas ao relógio (como na busca)
+
+    def __init__(self, tt_mb: float = 8.0, time_exceeded=None) -> None:
+        self.tt = TranspositionTable(tt_mb)
+        self.nodes = 0
+        self.time_exceeded = time_exceeded
+
+    def _ordered(self, cur: int, mask: int, possible: int) -> List[Tuple[int, int]]:
+        """(coluna, bit da jogada) do centro para as bordas, mais ameaças primeiro."""
+        moves = []
+        for col in CENTER_ORDER:
+            move = possible & COLUMN_MASKS[col]
+            if move:
+                moves.append((popcount(winning_cells(cur | move, mask | move)), col, move))
+        moves.sort(key=lambda m: -m[0])  # estável: empates seguem o centro
+        return [(col, move) for _, col, move in moves]
+
+    def _non_losing(self, cur: int, mask: int) -> int:
+        """Jogadas que não permitem vitória imediata do oponente (0 = todas perdem)."""
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+        opp_win = winning_cells(cur ^ mask, mask)
+        forced = possible & opp_win
+        if forced:
+            if forced & (forced - 1):
+                return 0  # duas ameaças imediatas
+            possible = forced
+        return possible & ~(opp_win >> 1)
+
+    def negamax(self, cur: int, mask: int, mcur: int, mmask: int, nb: int,
+                alpha: int, beta: int) -> int:
+        """Valor exato se estiver em (alpha, beta); supõe que quem joga não vence já."""
+        self.nodes += 1
+        if self.time_exceeded is not None and self.nodes % self.NODE_CHECK == 0 \
+                and self.time_exceeded():
+            raise SolverTimeout()
+        cells = ROWS * COLS
+        possible = self._non_losing(cur, mask)
+        if not possible:
+            return -((cells - nb) // 2)
+        if nb >= cells - 2:
+            return 0
+        # Limites: não dá para perder já na próxima jogada nem vencer agora
+        lo = -((cells - 2 - nb) // 2)
+        if alpha < lo:
+            alpha = lo
+            if alpha >= beta:
+                return alpha
+        hi = (cells - 1 - nb) // 2
+        key = min(cur + mask, mcur + mmask)
+        slot = self.tt.probe(key)
+        if slot >= 0:
+            hi = int(self.tt.values[slot])
+        if beta > hi:
+            beta = hi
+            if alpha >= beta:
+                return beta
+        for col, move in self._ordered(cur, mask, possible):
+            mcol = COLS - 1 - col
+            mmove = (mmask + (1 << (mcol * H))) & COLUMN_MASKS[mcol]
+            score = -self.negamax(cur ^ mask, mask | move, mcur ^ mmask, mmask | mmove,
+                                  nb + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        self.tt.store(key, 0, alpha, TT_UPPER, -1)
+        return alpha
+
+    @staticmethod
+    def _compact(pos: Position, player: int) -> Tuple[int, int, int, int]:
+        mask = pos.bits[P1] | pos.bits[P2]
+        mmask = pos.mirror_bits[P1] | pos.mirror_bits[P2]
+        return pos.bits[player], mask, pos.mirror_bits[player], mmask
+
+    def solve(self, pos: Position, player: int) -> int:
+        """Valor exato da posição com player a jogar."""
+        cur, mask, mcur, mmask = self._compact(pos, player)
+        nb = pos.moves
+        cells = ROWS * COLS
+        if winning_cells(cur, mask) & (mask + BOTTOM_MASK) & BOARD_MASK:
+            return (cells + 1 - nb) // 2
+        lo, hi = -((cells - nb) // 2), (cells + 1 - nb) // 2
+        while lo < hi:
+            # Janela nula no meio, puxada para 0 para provar logo o sinal
+            med = lo + (hi - lo) // 2
+            if med <= 0 and int(lo / 2) < med:
+                med = int(lo / 2)
+            elif med >= 0 and int(hi / 2) > med:
+                med = int(hi / 2)
+            r = self.negamax(cur, mask, mcur, mmask, nb, med, med + 1)
+            if r <= med:
+                hi = r
+            else:
+                lo = r
+        return lo
+
+    def best_move(self, pos: Position, player: int) -> Tuple[int, int]:
+        """(coluna, valor exato) de uma jogada ótima."""
+        cur, mask, mcur, mmask = self._compact(pos, player)
+        nb = pos.moves
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+        wins = winning_cells(cur, mask) & possible
+        if wins:
+            for col in CENTER_ORDER:
+                if wins & COLUMN_MASKS[col]:
+                    return col, (ROWS * COLS + 1 - nb) // 2
+        value = self.solve(pos, player)
+        for col, move in self._ordered(cur, mask, self._non_losing(cur, mask)):
+            mcol = COLS - 1 - col
+            mmove = (mmask + (1 << (mcol * H))) & COLUMN_MASKS[mcol]
+            # A jogada alcança value se o filho vale no máximo -value
+            r = self.negamax(cur ^ mask, mask | move, mcur ^ mmask, mmask | mmove,
+                             nb + 1, -value, -value + 1)
+            if r <= -value:
+                return col, value
+        # Todas as jogadas perdem já: qualquer uma serve
+        return pos.ordered_moves()[0], value
+
+def moves_to_end(score: int, moves: int) -> int:
+    """
+    Plies até o fim da partida com jogo perfeito, para o valor exato score
+    (EndgameSolver) numa posição com moves peças.
+    """
+    if score == 0:
+        return ROWS * COLS - moves
+    # A vitória vem com a peça jogada quando há n peças, (43 - n) // 2 = |score|,
+    # e n tem a paridade do vencedor
+    n = ROWS * COLS + 1 - 2 * abs(score)
+    first = moves if score > 0 else moves + 1
+    if (n - first) % 2:
+        n -= 1
+    return n - moves + 1
+
+# -----------------------------------------------------------------------------
+# Livro de aberturas
+# -----------------------------------------------------------------------------
+
+# Arquivo gerado por build_book.py: cabeçalho + registros ordenados por chave.
+# A chave é a menor entre a da posição e a da espelhada (a coluna é gravada
+# na orientação dessa chave) e o valor é do ponto de vista de quem joga,
+# limitado a +-BOOK_SCORE_MAX (vitória/derrota forçada).
+BOOK_MAGIC = b"C4BK"
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct("<4sHHI")   # magic, versão, profundidade, registros
+BOOK_RECORD = struct.Struct("<Qbh")     # chave, coluna, valor
+BOOK_SCORE_MAX = 32767
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+class OpeningBook:
+    """
+    Leitor do livro: o arquivo é mapeado com mmap e consultado por busca
+    binária, sem carregar os registros na memória.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.depth, self.size = BOOK_HEADER.unpack_from(self._mm, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            self.close()
+            raise ValueError(f"Livro de aberturas inválido: {path}")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def record(self, i: int) -> Tuple[int, int, int]:
+        return BOOK_RECORD.unpack_from(self._mm, BOOK_HEADER.size + i * BOOK_RECORD.size)
+
+    def probe(self, key: int) -> Optional[Tuple[int, int]]:
+        """(coluna, valor) gravados para a chave (já canônica), ou None."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k, col, score = self.record(mid)
+            if k == key:
+                return col, score
+            if k < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+def write_book(path: str, entries: Dict[int, Tuple[int, float]], depth: int) -> None:
+    """Grava {chave canônica: (coluna, valor)} no formato de OpeningBook."""
+    with open(path, "wb") as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, depth, len(entries)))
+        for key in sorted(entries):
+            col, score = entries[key]
+            score = max(-BOOK_SCORE_MAX, min(BOOK_SCORE_MAX, score))
+            f.write(BOOK_RECORD.pack(key, col, int(round(score))))
+
+# Livros abertos por caminho (None = arquivo ausente); abertos na primeira consulta
+_books: Dict[str, Optional[OpeningBook]] = {}
+
+def probe_book(pos: Position, turn: int,
+               path: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """
+    Consulta o livro para a posição com turn a jogar. Retorna (coluna, valor,
+    profundidade do livro) na orientação de pos, ou None (sem livro, posição
+    fora do livro ou turno diferente do implícito pela contagem de peças).
+    """
+    if not path:
+        return None
+    if path not in _books:
+        _books[path] = OpeningBook(path) if os.path.exists(path) else None
+    book = _books[path]
+    if book is None or turn != (P1 if pos.moves % 2 == 0 else P2):
+        return None
+    key, mirrored = pos.canonical_key()
+    hit = book.probe(key)
+    if hit is None:
+        return None
+    col, score = hit
+    if mirrored:
+        col = COLS - 1 - col
+    return col, score, book.depth
+
+def _iterative_deepening(pos: Position, turn: int, legal: List[int], max_depth: int,
+                         algorithm: str, tt: Optional[TranspositionTable],
+                         ordering: Optional[MoveOrdering], time_exceeded,
+                         verbose: bool = True, first_depth: int = 1,
+                         on_iteration=None, time_left_ms=None) -> Tuple[int, float, int, Dict]:
+    """
+    Aprofundamento iterativo na raiz, de first_depth até max_depth ou até
+    time_exceeded(). on_iteration(profundidade, jogada, valor, stats), se
+    dado, é chamado a cada iteração completa.
+
+    A partir da segunda iteração o relógio é consultado dentro da busca; se o
+    tempo acabar depois de a jogada da iteração anterior (a primeira da raiz)
+    ter sido buscada, a melhor jogada da iteração parcial é aproveitada.
+    time_left_ms(), se dado, retorna o tempo restante: uma iteração cujo
+    custo previsto (tempo da anterior vezes o fator de ramificação efetivo)
+    passe dele nem começa.
+
+    Retorna (melhor jogada, valor, profundidade atingida, estatísticas); em
+    estatísticas, "stop_reason" ("max_depth", "timeout" ou "predicted"),
+    "partial_depth" (profundidade da iteração parcial aproveitada, 0 se
+    nenhuma), "ebf" e "iterations" (um IterationStats por iteração).
+    """
+    # Iterative Deepening: explorar profundidades progressivamente
+    # Mantém sempre a melhor jogada conhecida enquanto há tempo
+    stats = {'nodes_visited': 0, 'pruned': 0}
+    best_move = legal[0]  # Fallback: primeira jogada válida
+    best_value = float('-inf')
+    final_depth = first_depth  # Profundidade final atingida
+    stop_reason = "max_depth"
+    partial_depth = 0
+    ebf = 0.0  # Fator de ramificação efetivo: nós(d) / nós(d - 1)
+    last_nodes, last_seconds = 0, 0.0
+    iterations: List[IterationStats] = []
+    
+    # Iterar sobre profundidades de first_depth até max_depth
+    for current_depth in range(first_depth, max_depth + 1):
+        # Verificar se estourou o tempo (a primeira iteração roda sempre, para
+        # que a jogada devolvida tenha sido buscada)
+        if current_depth > first_depth and time_exceeded():
+            if verbose:
+                print(f"Tempo esgotado na profundidade {current_depth}")
+            stop_reason = "timeout"
+            break
+        # Não começar uma iteração que não deve terminar a tempo
+        if time_left_ms is not None and ebf > 0:
+            predicted_ms = last_seconds * ebf * 1000.0
+            if predicted_ms > time_left_ms():
+                if verbose:
+                    print(f"Profundidade {current_depth} prevista em {predicted_ms:.0f} ms: "
+                          f"não cabe no tempo restante")
+                stop_reason = "predicted"
+                break
+        
+        # Resetar contadores para esta profundidade
+        depth_stats = {'nodes_visited': 0, 'pruned': 0}
+        
+        # Com a tabela, a melhor jogada da iteração anterior é buscada primeiro
+        root_moves = legal
+        if tt is not None:
+            root_moves = [best_move] + [c for c in legal if c != best_move]
+        
+        # Inicializar alpha e beta: no PVS, janela de aspiração em torno do
+        # valor da iteração anterior
+        alpha = float('-inf')
+        beta = float('inf')
+        aspiration = algorithm == "pvs" and current_depth > 1 and math.isfinite(best_value)
+        if aspiration:
+            alpha = best_value - ASPIRATION_WINDOW
+            beta = best_value + ASPIRATION_WINDOW
+        
+        # A primeira iteração é barata e sempre termina: garante uma jogada buscada
+        poll = time_exceeded if current_depth > first_depth else None
+        iteration_start = time.perf_counter()
+        depth_best_value, depth_best_move, searched = _search_root(
+            pos, turn, current_depth, root_moves, alpha, beta,
+            depth_stats, tt, algorithm, poll, ordering)
+        
+        if aspiration and searched == len(root_moves) and \
+                (depth_best_value <= alpha or depth_best_value >= beta):
+            # Falhou fora da janela de aspiração: refaz com a janela inteira
+            depth_stats['aspiration_researches'] = depth_stats.get('aspiration_researches', 0) + 1
+            alpha, beta = float('-inf'), float('inf')
+            depth_best_value, depth_best_move, searched = _search_root(
+                pos, turn, current_depth, root_moves, alpha, beta,
+                depth_stats, tt, algorithm, poll, ordering)
+        iteration_seconds = time.perf_counter() - iteration_start
+        
+        # Acumular estatísticas (os nós de uma iteração parcial também contam)
+        for k, v in depth_stats.items():
+            stats[k] = stats.get(k, 0) + v
+        iterations.append(IterationStats(current_depth, depth_stats['nodes_visited'],
+                                         iteration_seconds * 1000.0, depth_best_move,
+                                         depth_best_value, searched == len(root_moves)))
+        
+        if searched < len(root_moves):
+            # Iteração parcial: vale se a jogada da iteração anterior já foi
+            # buscada e nenhuma outra ficou só com um limite superior
+            if searched > 0 and root_moves[0] == best_move and depth_best_value > alpha:
+                best_move = depth_best_move
+                best_value = depth_best_value
+                partial_depth = current_depth
+            if verbose:
+                print(f"Tempo esgotado na profundidade {current_depth} "
+                      f"({searched}/{len(root_moves)} jogadas da raiz)")
+            stop_reason = "timeout"
+            break
+        
+        if depth_best_value == float('-inf'):
+            # Nenhuma jogada melhor que perder: mantém a melhor jogada conhecida
+            depth_best_move = best_move
+        
+        # Completou esta profundidade: atualizar melhor jogada
+        best_move = depth_best_move
+        best_value = depth_best_value
+        final_depth = current_depth
+        if last_nodes:
+            ebf = max(1.0, depth_stats['nodes_visited'] / last_nodes)
+        last_nodes, last_seconds = depth_stats['nodes_visited'], iteration_seconds
+        if on_iteration is not None:
+            on_iteration(current_depth, best_move, best_value, depth_stats)
+    
+    stats['stop_reason'] = stop_reason
+    stats['partial_depth'] = partial_depth
+    stats['ebf'] = ebf
+    stats['iterations'] = iterations
+    return best_move, best_value, final_depth, stats
+
+# Valor informado em info["score"] para vitória/derrota forçada (o JSON não
+# tem infinito)
+WIN_SCORE = 1000000.0
+
+def clamp_score(value: float) -> float:
+    """Valor da busca limitado a ±WIN_SCORE (vitória/derrota forçada)."""
+    return max(-WIN_SCORE, min(WIN_SCORE, value))
+
+@dataclass
+class IterationStats:
+    """Uma iteração do aprofundamento iterativo."""
+    depth: int
+    nodes: int
+    time_ms: float
+    move: int
+    score: float
+    complete: bool = True  # False: interrompida pelo tempo
+
+@dataclass
+class SearchStats:
+    """
+    Estatísticas de uma chamada a choose_move (ver search_with_stats).
+
+    method é "iterative_deepening", "book", "solver" ou "no_moves". cutoffs
+    conta as podas e first_move_cutoff_rate a fração delas na primeira jogada
+    tentada; tt_hits e tt_probes são só desta busca. pv é a variação principal
+    lida da tabela a partir da jogada escolhida; ebf é o fator de ramificação
+    efetivo das duas últimas iterações completas. details guarda as
+    informações próprias do método em dict (ex.: worker_nodes, solver_score,
+    pvs_researches) e fica fora de to_dict.
+    """
+    method: str = "iterative_deepening"
+    nodes: int = 0
+    time_ms: float = 0.0
+    nps: float = 0.0
+    depth_reached: int = 0
+    score: float = 0.0
+    cutoffs: int = 0
+    first_move_cutoff_rate: float = 0.0
+    tt_hits: int = 0
+    tt_probes: int = 0
+    ebf: float = 0.0
+    stop_reason: str = "max_depth"
+    pv: List[int] = field(default_factory=list)
+    iterations: List[IterationStats] = field(default_factory=list)
+    details: Dict = field(default_factory=dict)
+
+    def finish(self, start: float) -> "SearchStats":
+        """Fecha o tempo e os nós por segundo a partir do time.time() inicial."""
+        self.time_ms = (time.time() - start) * 1000.0
+        self.nps = self.nodes / (self.time_ms / 1000.0) if self.time_ms > 0 else 0.0
+        return self
+
+    def to_dict(self) -> Dict:
+        """Versão serializável em JSON (sem infinitos)."""
+        d = asdict(self)
+        del d['details']
+        d['score'] = clamp_score(self.score)
+        for it in d['iterations']:
+            it['score'] = clamp_score(it['score'])
+        return d
+
+def principal_variation(pos: Position, turn: int, first_move: int,
+                        tt: Optional[TranspositionTable], max_len: int) -> List[int]:
+    """
+    Variação principal começando por first_move (jogada de turn), seguindo as
+    jogadas guardadas na tabela enquanto forem válidas. pos volta ao estado
+    original.
+    """
+    pv = [first_move]
+    length = len(pos.history)
+    player = turn
+    pos.play(first_move, player)
+    while tt is not None and len(pv) < max_len and not pos.terminal()[0]:
+        player = other(player)
+        key, mirrored = pos.canonical_key()
+        slot = tt.probe(key)
+        if slot < 0 or tt.moves[slot] < 0:
+            break
+        col = tt.moves[slot]
+        if mirrored:
+            col = COLS - 1 - col
+        if not pos.can_play(col):
+            break
+        pv.append(col)
+        pos.play(col, player)
+    pos.rewind(length)
+    return pv
+
+def choose_move(board: List[List[int]], turn: int, config: Dict,
+                tt: Optional[TranspositionTable] = None,
+                verbose: bool = True, stop=None) -> int:
+    """
+    Decide a coluna (0..6) para jogar agora (parâmetros em search_with_stats).
+    Para as estatísticas da busca, chame search_with_stats.
+    """
+    return search_with_stats(board, turn, config, tt=tt, verbose=verbose, stop=stop)[0]
+
+def search_with_stats(board: List[List[int]], turn: int, config: Dict,
+                      tt: Optional[TranspositionTable] = None,
+                      verbose: bool = True, stop=None) -> Tuple[int, SearchStats]:
+    """
+    Decide a coluna (0..6) para jogar agora e devolve as estatísticas da busca.
 
     Parâmetros:
       - board: matriz 6x7 com valores {0,1,2}
       - turn: 1 ou 2
       - config: {"max_time_ms": int, "max_depth": int}
+        opcional: "tt_mb" (float, MB da tabela de transposição; 0 desliga)
+                  "algorithm": "alphabeta" (padrão) ou "pvs" (NegaScout com
+                  janelas de aspiração)
+                  "ordering": política de ordenação (ver ORDERINGS)
+                  "eval": "full", "incremental" ou "debug" (ver EVAL_MODES)
+                  "solver_empty": com até tantas casas vazias (padrão
+                  DEFAULT_SOLVER_EMPTY) a posição é resolvida de forma exata
+                  por EndgameSolver; details traz "result", "solver_score" e
+                  "moves_to_end". O resolvedor tem SOLVER_TIME_FRACTION do
+                  tempo; se não terminar, a busca normal usa o restante
+                  "book": caminho do livro de aberturas (padrão book.bin ao
+                  lado deste arquivo; None desliga)
+                  "smp_workers": número de processos da busca (padrão 1); com
+                  mais de um, processos auxiliares buscam a mesma posição
+                  sobre uma tabela compartilhada (ver SMPHelpers) e o
+                  parâmetro tt é ignorado
+      - tt: tabela de transposição já existente (ex.: mantida pelo servidor
+        entre jogadas da mesma partida); se None, cria uma conforme tt_mb
+      - verbose: False suprime os prints (usado nas chamadas em lote)
+      - stop: callable opcional; se retornar True a busca termina como se o
+        tempo tivesse acabado (usado para interromper a ponderação)
 
     Retorna:
-      - col: int (0..6)
+      - (col, SearchStats): coluna (0..6) e estatísticas desta busca; os
+        detalhes de cada método ficam em SearchStats.details
     """
     max_time_ms = int(config.get("max_time_ms"))
     max_depth = int(config.get("max_depth"))
+    algorithm = config.get("algorithm", "alphabeta")
+    ordering_name = config.get("ordering", DEFAULT_ORDERING)
+    eval_mode = config.get("eval", DEFAULT_EVAL)
     turn = int(turn)
 
-    print(f"AI choose_move called with max_time_ms={max_time_ms}, max_depth={max_depth}, player={turn}")
+    if verbose:
+        print(f"AI choose_move called with max_time_ms={max_time_ms}, max_depth={max_depth}, player={turn}")
+    
+    # Busca paralela: os auxiliares sobem (ou terminam de subir) antes de o
+    # relógio da jogada começar
+    smp_workers = int(config.get("smp_workers", 1))
+    helpers = None
+    if smp_workers > 1:
+        helpers = smp_helpers(smp_workers - 1, float(config.get("tt_mb", 16)) or 16.0)
+        helpers.start()
     
     start = time.time()
 
     # Função auxiliar para checar tempo decorrido   
     def time_exceeded():
-        return max_time_ms > 0 and (time.time() - start) * 1000.0 >= max_time_ms
+        return (max_time_ms > 0 and (time.time() - start) * 1000.0 >= max_time_ms) or \
+            (stop is not None and stop())
     
-    legal = valid_moves(board)
+    def time_left_ms():
+        return max_time_ms - (time.time() - start) * 1000.0 if max_time_ms > 0 else float('inf')
+    
+    pos = make_position(board, eval_mode)
+    # Posição espelhada: busca a orientação canônica e espelha a jogada no fim,
+    # para que tabuleiros espelhados recebam sempre colunas espelhadas
+    _, mirrored = pos.canonical_key()
+    if mirrored:
+        board = mirror_board(board)
+        pos = make_position(board, eval_mode)
+    legal = pos.valid_moves()
 
     move = 0
     if not legal:
         # Sem jogadas: devolve 0 por convenção (servidor lida com isso)
-        return move
-    
-    # Iterative Deepening: explorar profundidades progressivamente
-    # Mantém sempre a melhor jogada conhecida enquanto há tempo
-    stats = {'nodes_visited': 0, 'pruned': 0}
-    best_move = legal[0]  # Fallback: primeira jogada válida
-    best_value = float('-inf')
-    final_depth = 1  # Profundidade final atingida
+        return move, SearchStats(method='no_moves', details={
+            'nodes_visited': 0, 'method': 'no_moves'}).finish(start)
     
-    # Iterar sobre profundidades de 1 até max_depth
-    for current_depth in range(1, max_depth + 1):
-        # Verificar se estourou o tempo
-        if time_exceeded():
-            print(f"Tempo esgotado na profundidade {current_depth}")
-            break
-        
-        # Resetar contadores para esta profundidade
-        depth_stats = {'nodes_visited': 0, 'pruned': 0}
-        depth_best_value = float('-inf')
-        depth_best_move = best_move  # Começar com a melhor jogada conhecida
-        
-        # Inicializar alpha e beta
-        alpha = float('-inf')
-        beta = float('inf')
-        
-        # Avaliar cada jogada válida nesta profundidade
-        for col in legal:
-            if time_exceeded():
-                break
-                
-            new_board = make_move(board, col, turn)
-            if new_board is not None:
-                # Avaliar esta jogada com Minimax Alfa-Beta na profundidade atual
-                value = minimax_alphabeta(new_board, depth=1, max_depth=current_depth, 
-                                        player=turn, is_maximizing=False, 
-                                        alpha=alpha, beta=beta, stats=depth_stats)
-                
-                if value > depth_best_value:
-                    depth_best_value = value
-                    depth_best_move = col
-                
-                # Atualizar alpha
-                alpha = max(alpha, depth_best_value)
-        
-        # Se completou esta profundidade, atualizar melhor jogada
-        if not time_exceeded() or current_depth == 1:
-            best_move = depth_best_move
-            best_value = depth_best_value
-            final_depth = current_depth
-            # Acumular estatísticas
-            stats['nodes_visited'] += depth_stats['nodes_visited']
-            stats['pruned'] += depth_stats.get('pruned', 0)
+    # Livro de aberturas: consultado antes de qualquer busca
+    book_hit = probe_book(pos, turn, config.get("book", DEFAULT_BOOK_PATH))
+    if book_hit is not None and book_hit[0] in legal:
+        move, score, book_depth = book_hit
+        if mirrored:
+            move = COLS - 1 - move
+        info = {'nodes_visited': 0, 'method': 'book', 'book_hit': True, 'score': score,
+                'depth_reached': book_depth, 'max_depth': max_depth, 'mirrored': mirrored}
+        if verbose:
+            print(f"Jogada do livro de aberturas: {move} (valor {score})")
+        return move, SearchStats(method='book', depth_reached=book_depth, score=score,
+                                 pv=[move], details=info).finish(start)
+
+    # Poucas casas vazias: resolve de forma exata (se couber no tempo)
+    empty = ROWS * COLS - pos.moves
+    if empty <= int(config.get("solver_empty", DEFAULT_SOLVER_EMPTY)):
+        solver_deadline_ms = max_time_ms * SOLVER_TIME_FRACTION
+
+        def solver_time_exceeded():
+            return (max_time_ms > 0 and (time.time() - start) * 1000.0 >= solver_deadline_ms) or \
+                (stop is not None and stop())
+
+        solver = EndgameSolver(time_exceeded=solver_time_exceeded)
+        try:
+            move, exact = solver.best_move(pos, turn)
+        except SolverTimeout:
+            if verbose:
+                print(f"Resolvedor exato sem tempo ({solver.nodes} nós): busca heurística")
         else:
-            # Tempo esgotado, usar melhor jogada da profundidade anterior
-            break
+            if mirrored:
+                move = COLS - 1 - move
+            result = "win" if exact > 0 else ("loss" if exact < 0 else "draw")
+            info = {
+                'nodes_visited': solver.nodes, 'method': 'solver', 'max_depth': max_depth,
+                'depth_reached': empty, 'book_hit': False, 'mirrored': mirrored,
+                'solver_score': exact, 'result': result,
+                'moves_to_end': moves_to_end(exact, pos.moves),
+                'score': WIN_SCORE if exact > 0 else (-WIN_SCORE if exact < 0 else 0.0),
+            }
+            if verbose:
+                print(f"Resolvedor exato: {result} em {info['moves_to_end']} jogadas")
+            return move, SearchStats(method='solver', nodes=solver.nodes, depth_reached=empty,
+                                     score=info['score'], pv=[move], details=info).finish(start)
+
+    # Busca paralela: processos auxiliares com a tabela em memória compartilhada
+    if helpers is not None:
+        tt = helpers.tt
+        helpers.start_search(board, turn, config, start)
+
+    # Tabela de transposição compartilhada entre as iterações (0 desliga)
+    if tt is None:
+        tt_mb = float(config.get("tt_mb", 16))
+        tt = TranspositionTable(tt_mb) if tt_mb > 0 else None
+    tt_before = tt.counters() if tt is not None else {}
+    # Killers/histórico compartilhados entre as iterações
+    ordering = make_ordering(ordering_name)
+    
+    # Ameaças na raiz: vitória imediata vira a única jogada, bloqueio forçado
+    # e jogadas que entregam a vitória ao oponente saem da lista
+    threat_status, threat_filtered = threat_moves(pos, turn, legal, max_depth)
+    if threat_status >= 0:
+        legal = threat_filtered
     
-    move = best_move
+    best_move, best_value, final_depth, stats = _iterative_deepening(
+        pos, turn, legal, max_depth, algorithm, tt, ordering, time_exceeded, verbose,
+        time_left_ms=time_left_ms)
+    
+    smp_info = {}
+    if helpers is not None:
+        reports = helpers.finish()
+        main_nodes = stats['nodes_visited']
+        # Um auxiliar que completou uma iteração mais profunda decide a jogada
+        for nodes, depth, col in reports:
+            stats['nodes_visited'] += nodes
+            if depth > final_depth and col in legal:
+                best_move, final_depth = col, depth
+        smp_info = {
+            'smp_workers': smp_workers,
+            'worker_nodes': [main_nodes] + [r[0] for r in reports],
+            'worker_depths': [final_depth] + [r[1] for r in reports],
+        }
+    
+    move = COLS - 1 - best_move if mirrored else best_move
+    tt_after = tt.counters() if tt is not None else {}
+    pv = principal_variation(pos, turn, best_move, tt, max(1, final_depth))
+    if mirrored:
+        pv = [COLS - 1 - c for c in pv]
     
     # Retornar informações sobre a busca (útil para experimentos)
     info = {
         'nodes_visited': stats['nodes_visited'],
         'pruned_nodes': stats.get('pruned', 0),
         'method': 'iterative_deepening',
+        'algorithm': algorithm,
+        'ordering': ordering_name,
+        'eval': eval_mode,
         'depth_reached': final_depth,
-        'max_depth': max_depth
+        'max_depth': max_depth,
+        'score': clamp_score(best_value),
+        'book_hit': False,
+        'mirrored': mirrored,
+        'stop_reason': stats['stop_reason'],
+        'partial_depth': stats['partial_depth']
     }
+    # Qualidade da ordenação: fração de podas já na primeira jogada e média
+    # de jogadas tentadas até a poda
+    cutoffs = stats.get('pruned', 0)
+    if cutoffs:
+        info['first_move_cutoff_rate'] = stats.get('first_move_cutoffs', 0) / cutoffs
+        info['avg_moves_to_cutoff'] = stats.get('cutoff_moves_tried', 0) / cutoffs
+    if algorithm == "pvs":
+        info['pvs_researches'] = stats.get('pvs_researches', 0)
+        info['aspiration_researches'] = stats.get('aspiration_researches', 0)
+    if tt is not None:
+        info.update({k: v - tt_before[k] for k, v in tt_after.items()})
+    info.update(smp_info)
+    search_stats = SearchStats(
+        nodes=stats['nodes_visited'], depth_reached=final_depth, score=best_value,
+        cutoffs=cutoffs, first_move_cutoff_rate=info.get('first_move_cutoff_rate', 0.0),
+        tt_hits=info.get('tt_hits', 0),
+        tt_probes=info.get('tt_hits', 0) + info.get('tt_misses', 0),
+        ebf=stats['ebf'], stop_reason=stats['stop_reason'], pv=pv,
+        iterations=stats['iterations'], details=info).finish(start)
     
-    return move
+    return move, search_stats
+
+# -----------------------------------------------------------------------------
+# Busca paralela (lazy SMP)
+# -----------------------------------------------------------------------------
+
+def _smp_helper_loop(index: int, jobs, done, stop, nodes, depths, moves,
+                     tt_name: str, tt_mb: float) -> None:
+    """
+    Laço de um processo auxiliar: para cada posição recebida, roda o mesmo
+    aprofundamento iterativo do processo principal sobre a tabela
+    compartilhada, com a ordem das jogadas da raiz rotacionada e (nos
+    auxiliares pares) começando uma profundidade acima, para que os processos
+    não busquem as mesmas subárvores na mesma ordem. Publica nós, profundidade
+    e jogada de cada iteração completa nos arrays compartilhados.
+    """
+    tt = SharedTranspositionTable(tt_mb, name=tt_name)
+    done.put(("ready", index))
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        board, turn, config, start = job
+        max_time_ms = int(config.get("max_time_ms"))
+        max_depth = int(config.get("max_depth"))
+
+        def time_exceeded():
+            return stop.value or (max_time_ms > 0 and
+                                  (time.time() - start) * 1000.0 >= max_time_ms)
+
+        def on_iteration(depth, col, value, depth_stats):
+            nodes[index] += depth_stats['nodes_visited']
+            depths[index] = depth
+            moves[index] = col
+
+        pos = make_position(board, config.get("eval", DEFAULT_EVAL))
+        legal = pos.valid_moves()
+        status, filtered = threat_moves(pos, turn, legal, max_depth)
+        if status >= 0:
+            legal = filtered
+        k = (index + 1) % len(legal)
+        legal = legal[k:] + legal[:k]
+        first_depth = min(max_depth, 1 + (index + 1) % 2)
+        _iterative_deepening(pos, turn, legal, max_depth,
+                             config.get("algorithm", "alphabeta"), tt,
+                             make_ordering(config.get("ordering", DEFAULT_ORDERING)),
+                             time_exceeded, verbose=False, first_depth=first_depth,
+                             on_iteration=on_iteration)
+        done.put(index)
+    tt.close()
+
+class SMPHelpers:
+    """
+    Processos auxiliares persistentes da busca paralela e a tabela de
+    transposição compartilhada entre eles e o processo principal.
+
+    start() sobe os auxiliares e espera que estejam prontos; choose_move o
+    chama antes de começar a contar o tempo da jogada. start_search() envia a
+    posição a todos; finish() sinaliza parada, espera cada auxiliar terminar
+    a jogada da raiz em andamento (até grace_s) e devolve [(nós,
+    profundidade, jogada)] por auxiliar. Um auxiliar que não para a tempo é
+    encerrado e recriado na hora, sem esperar: sobe enquanto o oponente joga.
+    """
+
+    def __init__(self, num_helpers: int, tt_mb: float, grace_s: float = 0.25) -> None:
+        self.num_helpers = num_helpers
+        self.grace_s = grace_s
+        self.tt = SharedTranspositionTable(tt_mb)
+        self._ctx = multiprocessing.get_context("spawn")
+        self.stop = self._ctx.Value('b', 0, lock=False)
+        self.nodes = self._ctx.Array('q', num_helpers, lock=False)
+        self.depths = self._ctx.Array('b', num_helpers, lock=False)
+        self.moves = self._ctx.Array('b', num_helpers, lock=False)
+        self._done = self._ctx.Queue()
+        self._procs: List = [None] * num_helpers
+        self._jobs: List = [None] * num_helpers
+        self._starting: set = set()  # recriados que ainda não avisaram "pronto"
+
+    def _spawn(self, i: int) -> None:
+        self._starting.add(i)
+        self._jobs[i] = self._ctx.Queue()
+        self._procs[i] = self._ctx.Process(
+            target=_smp_helper_loop,
+            args=(i, self._jobs[i], self._done, self.stop, self.nodes, self.depths,
+                  self.moves, self.tt.name, self.tt.size_mb),
+            daemon=True)
+        self._procs[i].start()
+
+    def start(self) -> None:
+        """Sobe os auxiliares que não estão de pé e espera que importem search.py."""
+        for i in range(self.num_helpers):
+            if self._procs[i] is None or not self._procs[i].is_alive():
+                self._spawn(i)
+        # Descarta avisos atrasados da busca anterior e espera os "pronto"
+        while True:
+            try:
+                msg = self._done.get(block=bool(self._starting))
+            except queue.Empty:
+                break
+            if isinstance(msg, tuple):
+                self._starting.discard(msg[1])
+
+    def start_search(self, board: List[List[int]], turn: int, config: Dict,
+                     start: float) -> None:
+        self.stop.value = 0
+        for i in range(self.num_helpers):
+            self.nodes[i] = 0
+            self.depths[i] = 0
+            self.moves[i] = -1
+            self._jobs[i].put((board, turn, config, start))
+
+    def finish(self) -> List[Tuple[int, int, int]]:
+        """Para os auxiliares e devolve [(nós, profundidade, jogada)]."""
+        self.stop.value = 1
+        pending = set(range(self.num_helpers))
+        deadline = time.time() + self.grace_s
+        while pending:
+            try:
+                pending.discard(self._done.get(timeout=max(0.0, deadline - time.time())))
+            except queue.Empty:
+                break
+        for i in pending:
+            # Ainda no meio de uma subárvore: encerra (a tabela não tem locks
+            # a liberar) e recria já, para subir fora do tempo da próxima jogada
+            self._procs[i].terminate()
+            self._procs[i].join()
+            self._spawn(i)
+        return [(self.nodes[i], self.depths[i], self.moves[i])
+                for i in range(self.num_helpers)]
+
+    def close(self) -> None:
+        for i, proc in enumerate(self._procs):
+            if proc is not None and proc.is_alive():
+                self._jobs[i].put(None)
+                proc.join(1.0)
+                if proc.is_alive():
+                    proc.terminate()
+            self._procs[i] = None
+        self.tt.unlink()
+
+# Auxiliares reaproveitados entre jogadas: (número, MB da tabela) -> SMPHelpers
+_smp_pools: Dict[Tuple[int, float], SMPHelpers] = {}
+
+def smp_helpers(num_helpers: int, tt_mb: float) -> SMPHelpers:
+    """Auxiliares da busca paralela, criados na primeira chamada."""
+    key = (num_helpers, tt_mb)
+    if key not in _smp_pools:
+        pool = SMPHelpers(num_helpers, tt_mb)
+        pool.start()
+        _smp_pools[key] = pool
+    return _smp_pools[key]
+
+@atexit.register
+def close_smp_helpers() -> None:
+    for pool in _smp_pools.values():
+        pool.close()
+    _smp_pools.clear()
+
+def predicted_reply(board: List[List[int]], turn: int, col: int,
+                    tt: Optional[TranspositionTable]) -> Optional[int]:
+    """
+    Resposta esperada do oponente depois de turn jogar col: a jogada guardada
+    na tabela para a posição resultante (a variação principal da busca que
+    escolheu col). None se a partida acaba ou se a tabela não tem a posição.
+    """
+    pos = Position.from_board(board)
+    if not pos.can_play(col):
+        return None
+    pv = principal_variation(pos, turn, col, tt, 2)
+    return pv[1] if len(pv) > 1 else None
+
+# -----------------------------------------------------------------------------
+# Lotes de posições
+# -----------------------------------------------------------------------------
+
+def choose_moves_chunk(boards: List[List[List[int]]], turns: List[int], config: Dict,
+                       tt: Optional[TranspositionTable] = None) -> List[Tuple[int, Dict]]:
+    """
+    Escolhe a jogada de cada posição em sequência com uma única tabela de
+    transposição: subárvores em comum entre posições próximas (ex.: jogadas
+    seguidas da mesma partida) são buscadas uma vez só.
+
+    Segue o contrato func(board, turn, config, tt=...) dos workers da engine,
+    com listas no lugar de board e turn. Retorna [(col, info)].
+    """
+    if tt is None:
+        tt_mb = float(config.get("tt_mb", 16))
+        tt = TranspositionTable(tt_mb) if tt_mb > 0 else None
+    results = []
+    for board, turn in zip(boards, turns):
+        col, stats = search_with_stats(board, turn, config, tt=tt, verbose=False)
+        results.append((col, dict(stats.details, stats=stats.to_dict())))
+    return results
+
+def batch_groups(boards: List[List[List[int]]], turns: List[int],
+                 num_groups: int) -> Tuple[List[int], List[bool], List[List[int]]]:
+    """
+    Prepara um lote para ser dividido entre processos.
+
+    Retorna (unique_of, flipped, groups): unique_of[i] é o índice da primeira
+    ocorrência da posição i, a menos de espelhamento (posições repetidas são
+    buscadas uma vez), flipped[i] diz se a posição i é a espelhada dessa
+    ocorrência (a coluna deve ser remapeada) e groups divide as posições
+    únicas em até num_groups fatias contíguas, mantendo juntas as posições
+    vizinhas na entrada, que costumam compartilhar subárvores.
+    """
+    first: Dict[Tuple[int, int], Tuple[int, bool]] = {}
+    unique_of = []
+    flipped = []
+    for i, (board, turn) in enumerate(zip(boards, turns)):
+        key, mirrored = Position.from_board(board).canonical_key()
+        u, u_mirrored = first.setdefault((key, int(turn)), (i, mirrored))
+        unique_of.append(u)
+        flipped.append(mirrored != u_mirrored)
+    unique = sorted(u for u, _ in first.values())
+    num_groups = max(1, min(num_groups, len(unique)))
+    size, extra = divmod(len(unique), num_groups)
+    groups, start = [], 0
+    for g in range(num_groups):
+        end = start + size + (g < extra)
+        groups.append(unique[start:end])
+        start = end
+    return unique_of, flipped, groups
+
+def choose_moves_batch(boards: List[List[List[int]]], turns: List[int],
+                       config: Dict) -> List[Tuple[int, Dict]]:
+    """
+    Escolhe a jogada de muitas posições numa chamada só.
+
+    As posições únicas são divididas entre config["batch_workers"] processos
+    (padrão: número de CPUs); cada processo busca sua fatia com
+    choose_moves_chunk, compartilhando uma tabela de transposição. Com um
+    único worker (ou uma única posição) tudo roda no processo atual.
+
+    Retorna [(col, info)] na ordem de entrada; posições repetidas (ou
+    espelhadas) recebem o mesmo resultado, com info["duplicate_of"] apontando
+    a primeira.
+    """
+    if len(boards) != len(turns):
+        raise ValueError("boards e turns devem ter o mesmo tamanho")
+    workers = int(config.get("batch_workers", os.cpu_count() or 1))
+    unique_of, flipped, groups = batch_groups(boards, turns, workers)
+
+    by_index: Dict[int, Tuple[int, Dict]] = {}
+    if len(groups) <= 1:
+        for group in groups:
+            chunk = choose_moves_chunk([boards[i] for i in group],
+                                       [turns[i] for i in group], config)
+            by_index.update(zip(group, chunk))
+    else:
+        # spawn: não herda o estado do processo pai (ex.: threads do servidor)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(groups), mp_context=ctx) as pool:
+            futures = [(group, pool.submit(choose_moves_chunk,
+                                           [boards[i] for i in group],
+                                           [turns[i] for i in group], config))
+                       for group in groups]
+            for group, future in futures:
+                by_index.update(zip(group, future.result()))
+
+    results = []
+    for i, u in enumerate(unique_of):
+        col, info = by_index[u]
+        if u != i:
+            info = dict(info, duplicate_of=u)
+        if flipped[i]:
+            col = COLS - 1 - col
+        results.append((col, info))
+    return results
 
-def choose_move_infinity(board: List[List[int]], turn: int, config: Dict) -> Tuple[int, Dict]:
+def choose_move_infinity(board: List[List[int]], turn: int, config: Dict,
+                         tt: Optional[TranspositionTable] = None) -> Tuple[int, Dict]:
     """
     Decide a coluna (0..6) para jogar agora.
 
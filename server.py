@@ -1,9 +1,12 @@
 # server.py
+import os
 import time
-from multiprocessing import Process, Queue, get_context
-from flask import Flask, render_template, request, jsonify
+import threading
+from flask import Flask, Response, render_template, request, jsonify
 from flask_cors import CORS
 import search  
+import metrics
+from engine import EnginePool
 
 app = Flask(__name__)
 CORS(app)
@@ -11,10 +14,14 @@ CORS(app)
 ROWS, COLS = 6, 7
 
 AI_PLAYERS = {
-    "AI_Minimax": search.choose_move,  # Nossa implementação completa (Minimax + Alfa-Beta + ID)
+    # Nossa implementação completa (Minimax + Alfa-Beta + ID), com as estatísticas da busca
+    "AI_Minimax": search.search_with_stats,
     "AI_Dummy": search.choose_move_infinity  # Loop infinito (para testar timeout)
 }
 
+# Jogadores que podem ponderar entre requisições (aceitam stop, como search_with_stats)
+PONDER_PLAYERS = {"AI_Minimax"}
+
 def fallback_move(board):
     """Escolhe a primeira coluna válida (fallback simples)."""
     for c in range(COLS):
@@ -22,50 +29,105 @@ def fallback_move(board):
             return c
     return 0  # Nenhuma jogada possível (tabuleiro cheio)
 
-def _agent_worker(board, player, turn, config, q):
-    """Roda em OUTRO processo para isolar travamentos/loops infinitos."""
-    try:
-        col = AI_PLAYERS[player](board, turn, config)
-        q.put(("ok", col))
-    except Exception as e:
-        q.put(("err", str(e)))
+# Processos de engine persistentes: mantêm as tabelas de transposição de cada
+# partida (game_id) entre requisições. Pré-iniciados no __main__ (ou sob
+# demanda na primeira jogada).
+ENGINE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+engine = EnginePool(size=ENGINE_WORKERS, max_sessions=8, memory_mb=256.0,
+                    idle_timeout_s=600.0)
+
+# Métricas expostas em /metrics (formato de texto do Prometheus)
+registry = metrics.Registry()
+AI_MOVE_SECONDS = registry.histogram(
+    "c4_ai_move_seconds", "Latência de /ai_move (requisição inteira).",
+    metrics.LATENCY_BUCKETS)
+AI_MOVE_BATCH_SECONDS = registry.histogram(
+    "c4_ai_move_batch_seconds", "Latência de /ai_move_batch (requisição inteira).",
+    metrics.LATENCY_BUCKETS)
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "c4_engine_queue_wait_seconds", "Espera por um worker livre da engine.",
+    metrics.LATENCY_BUCKETS)
+OVERHEAD_SECONDS = registry.histogram(
+    "c4_engine_overhead_seconds",
+    "Tempo de engine.run além da fila e da busca (IPC, serialização, recriação do processo).",
+    metrics.LATENCY_BUCKETS)
+SEARCH_DEPTH = registry.histogram(
+    "c4_search_depth", "Profundidade atingida por jogada.", metrics.DEPTH_BUCKETS)
+SEARCH_NPS = registry.histogram(
+    "c4_search_nps", "Nós por segundo das jogadas buscadas.", metrics.NPS_BUCKETS)
+ENGINE_JOBS = registry.counter(
+    "c4_engine_jobs_total", "Jogadas enviadas à engine, por status.", ("status",))
+FALLBACK_MOVES = registry.counter(
+    "c4_fallback_moves_total", "Jogadas de fallback em /ai_move, por motivo.", ("reason",))
+PONDER_RESULTS = registry.counter(
+    "c4_ponder_total", "Resultado da ponderação na jogada seguinte.", ("result",))
+BUSY_SECONDS = registry.counter(
+    "c4_engine_busy_seconds_total", "Tempo ocupado de cada worker da engine.", ("worker",))
+registry.callback("c4_engine_workers", "Workers da engine.", lambda: len(engine.workers))
+registry.callback("c4_engine_workers_busy", "Workers da engine com uma jogada em andamento.",
+                  lambda: sum(w.lock.locked() for w in engine.workers))
+registry.callback("c4_engine_workers_alive", "Workers da engine com o processo de pé.",
+                  lambda: sum(w.alive() for w in engine.workers))
+registry.callback("c4_engine_spawns_total", "Processos de engine criados (inclusive recriações).",
+                  lambda: sum(w.spawns for w in engine.workers), kind="counter")
+registry.callback("c4_engine_spawn_seconds_total",
+                  "Tempo total até os processos de engine ficarem prontos.",
+                  lambda: sum(w.spawn_seconds for w in engine.workers), kind="counter")
+
+def run_engine(func, board, turn, config, game_id, timeout_s):
+    """engine.run registrando status, espera na fila, ocupação e overhead."""
+    t0 = time.time()
+    status, payload, extra = engine.run(func, board, turn, config, game_id, timeout_s)
+    elapsed = time.time() - t0
+    queue_wait = extra.get("queue_wait_ms", 0) / 1000.0
+    ENGINE_JOBS.inc(status)
+    QUEUE_WAIT_SECONDS.observe(queue_wait)
+    BUSY_SECONDS.inc(extra.get("worker"), amount=elapsed - queue_wait)
+    if "search_ms" in extra:
+        OVERHEAD_SECONDS.observe(max(0.0, elapsed - queue_wait - extra["search_ms"] / 1000.0))
+    return status, payload, extra
 
-def run_agent_with_timeout(board, player, turn, config, timeout_s=5.0):
+def run_agent_with_timeout(board, player, turn, config, timeout_s=5.0, game_id=None):
     """
-    Executa choose_move em um processo separado e aplica um hard timeout.
-    Retorna (col, info, flags) — onde flags indica timeout/crash.
+    Executa choose_move no processo da engine e aplica um hard timeout.
+    Retorna (col, info) — onde info indica timeout/crash.
     """
-    ctx = get_context("spawn")
-    q = ctx.Queue()
-    p = ctx.Process(target=_agent_worker, args=(board, player, turn, config, q))
-    p.start()
-    p.join(timeout_s)
-
-    if p.is_alive():
-        # Estourou tempo: mata o processo
-        p.terminate()
-        p.join()
+    if player not in AI_PLAYERS:
         col = fallback_move(board)
-        info = {"timeout": True, "method": "fallback"}
+        info = {"error": f"Jogador desconhecido: {player}", "method": "fallback"}
+        FALLBACK_MOVES.inc("unknown_player")
         return col, info
 
-    # Processo terminou; coleta a resposta
-    if q.empty():
+    status, payload, extra = run_engine(AI_PLAYERS[player], board, turn, config,
+                                        game_id, timeout_s)
+
+    if status == "timeout":
+        # Estourou tempo: o worker foi encerrado e será substituído
+        col = fallback_move(board)
+        info = {"timeout": True, "method": "fallback"}
+    elif status == "crash":
         # Crash silencioso
         col = fallback_move(board)
         info = {"crash": True, "method": "fallback"}
-        return col, info
-
-    status, payload = q.get()
-    if status == "ok":
+    elif status == "ok":
         col = payload
         info = {"method": "AI"}
-        return col, info
     else:
         # Exceção no código do aluno
         col = fallback_move(board)
         info = {"error": payload, "method": "fallback"}
-        return col, info
+    if info["method"] == "fallback":
+        FALLBACK_MOVES.inc(status)
+    # worker, queue_wait_ms (espera por um worker livre), search_ms, ...
+    info.update(extra)
+    stats = extra.get("stats")
+    if stats:
+        SEARCH_DEPTH.observe(stats["depth_reached"])
+        if stats["nodes"]:
+            SEARCH_NPS.observe(stats["nps"])
+    if "ponder" in extra:
+        PONDER_RESULTS.inc(extra["ponder"])
+    return col, info
     
 def parse_board_str(board_str: str):
     """
@@ -93,6 +155,57 @@ def parse_board_str(board_str: str):
         board.append(row)
     return board
 
+def parse_board_value(value):
+    """Aceita o tabuleiro como string (formato de parse_board_str) ou matriz 6x7."""
+    if isinstance(value, list):
+        if not all(isinstance(row, list) for row in value):
+            raise ValueError("Tabuleiro inválido: esperado lista de linhas.")
+        value = ';'.join(''.join(str(v) for v in row) for row in value)
+    return parse_board_str(value)
+
+def run_batch_with_timeout(boards, turns, config, timeout_s_per_position):
+    """
+    Divide o lote entre os workers da engine (search.batch_groups) e roda cada
+    fatia com search.choose_moves_chunk, em paralelo. Cada fatia tem hard
+    timeout proporcional ao seu tamanho; se estourar, as posições dela
+    recebem a jogada de fallback.
+    Retorna (cols, infos) na ordem de entrada e o número de fatias.
+    """
+    unique_of, flipped, groups = search.batch_groups(boards, turns, len(engine.workers))
+    by_index = {}
+
+    def run_group(group):
+        status, payload, extra = run_engine(search.choose_moves_chunk,
+                                            [boards[i] for i in group],
+                                            [turns[i] for i in group], config,
+                                            None, timeout_s_per_position * len(group))
+        for k, i in enumerate(group):
+            if status == "ok":
+                col, info = payload[k]
+                info = dict(info, method="AI", worker=extra.get("worker"))
+            else:
+                col = fallback_move(boards[i])
+                info = {"method": "fallback", "worker": extra.get("worker")}
+                info.update({status: True} if status in ("timeout", "crash") else {"error": payload})
+            by_index[i] = (col, info)
+
+    threads = [threading.Thread(target=run_group, args=(g,)) for g in groups]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    cols, infos = [], []
+    for i, u in enumerate(unique_of):
+        col, info = by_index[u]
+        if u != i:
+            info = dict(info, duplicate_of=u)
+        if flipped[i]:
+            col = COLS - 1 - col
+        cols.append(col)
+        infos.append(info)
+    return cols, infos, len(groups)
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -117,9 +230,17 @@ def ai_move():
       - turn: de quem é o turno nesse momento (1 ou 2)
       - max_depth: int >= 1 (default 5)
       - max_time_ms: int >= 0 (0 = sem limite, default 2000)
+      - game_id: (opcional) identificador da partida; jogadas da mesma partida
+        reaproveitam a tabela de transposição da engine
+      - ponder: 0 ou 1 (default 1); com game_id, a engine continua buscando a
+        posição esperada depois da resposta do oponente enquanto espera a
+        próxima requisição (info.ponder: "hit", "partial" ou "miss")
 
     Retorna JSON:
       { "result": "success", "col": int, "info": { ... } }
+    info.stats traz as estatísticas da busca (search.SearchStats: nós, nós por
+    segundo, podas, acertos na tabela, tempo por iteração, variação principal,
+    fator de ramificação efetivo), exceto quando a jogada vem do fallback.
     """
     # Lê parâmetros
     board_str = request.args.get("board", type=str)
@@ -127,6 +248,8 @@ def ai_move():
     turn = request.args.get("turn", type=str)
     max_time_ms = request.args.get("max_time_ms", type=int)
     max_depth = request.args.get("max_depth", type=int)
+    game_id = request.args.get("game_id", type=str)
+    ponder = request.args.get("ponder", default=1, type=int) != 0
 
     print(player)
 
@@ -135,14 +258,18 @@ def ai_move():
 
     # Executa agente com timeout
     config = {"max_time_ms": max_time_ms, "max_depth": max_depth}
+    if ponder and game_id and player in PONDER_PLAYERS:
+        config["ponder"] = True
 
     # Define hard timeout (com margem)
     hard_timeout_s = max(1.0, (max_time_ms or 2000) / 1000.0 + 0.2)  # margem de 200ms
     
     # Executa agente com timeout
     t0 = time.time()
-    col, info = run_agent_with_timeout(board, player, turn, config, timeout_s=hard_timeout_s)
+    col, info = run_agent_with_timeout(board, player, turn, config, timeout_s=hard_timeout_s,
+                                       game_id=game_id)
     t1 = time.time()
+    AI_MOVE_SECONDS.observe(t1 - t0)
 
     # Calcula tempo decorrido
     elapsed_ms = int((t1 - t0) * 1000)
@@ -157,5 +284,65 @@ def ai_move():
 
     return jsonify({"result": "success", "col": col, "info": info})
 
+@app.route("/ai_move_batch", methods=["POST"])
+def ai_move_batch():
+    """
+    Escolhe a jogada de várias posições numa requisição só.
+
+    Corpo JSON:
+      {
+        "positions": [{"board": "0000000;...;0000000", "turn": 1}, ...],
+        "max_depth": int >= 1 (default 5),
+        "max_time_ms": int >= 0 (por posição; 0 = sem limite, default 2000)
+      }
+    board também pode ser uma matriz 6x7. Posições repetidas são buscadas uma
+    vez; as fatias do lote rodam em paralelo nos workers da engine, cada uma
+    com uma tabela de transposição compartilhada entre suas posições.
+
+    Retorna JSON:
+      { "result": "success", "cols": [int, ...], "infos": [{ ... }, ...],
+        "info": { "positions": int, "groups": int, "elapsed_ms": int } }
+    """
+    data = request.get_json(silent=True) or {}
+    positions = data.get("positions")
+    if not isinstance(positions, list) or not positions:
+        return jsonify({"result": "error", "message": "Campo 'positions' ausente ou vazio."}), 400
+    try:
+        boards = [parse_board_value(p.get("board")) for p in positions]
+        turns = [int(p.get("turn")) for p in positions]
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({"result": "error", "message": str(e)}), 400
+
+    max_time_ms = int(data.get("max_time_ms", 2000))
+    max_depth = int(data.get("max_depth", 5))
+    config = {"max_time_ms": max_time_ms, "max_depth": max_depth}
+
+    # Hard timeout por posição (com margem), como em /ai_move
+    timeout_s = max(1.0, (max_time_ms or 2000) / 1000.0 + 0.2)
+
+    t0 = time.time()
+    cols, infos, groups = run_batch_with_timeout(boards, turns, config, timeout_s)
+    AI_MOVE_BATCH_SECONDS.observe(time.time() - t0)
+    elapsed_ms = int((time.time() - t0) * 1000)
+
+    print(f"AI batch: {len(boards)} posições em {groups} fatias, {elapsed_ms} ms")
+
+    return jsonify({"result": "success", "cols": cols, "infos": infos,
+                    "info": {"positions": len(boards), "groups": groups,
+                             "elapsed_ms": elapsed_ms}})
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """
+    Métricas no formato de texto do Prometheus: latência de /ai_move, espera
+    na fila e overhead da engine, profundidade e nós por segundo, timeouts e
+    fallbacks, ocupação dos workers (ver registry acima).
+    """
+    return Response(registry.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
+    # Com debug=True o reloader executa este bloco também no processo que só
+    # observa arquivos: os workers sobem apenas no processo que atende
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        engine.start()
     app.run(host="0.0.0.0", port=5001, debug=True)
\ No newline at end of file
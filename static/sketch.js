@@ -7,6 +7,7 @@ let gameStarted = false;
 let cellSize = 80, margin = 16;
 let board, turn = 1, winner = 0, aiThinking = false;
 let players = { 1: "", 2: "" };
+let gameId = "";
 
 const API = "http://localhost:5001/";
 
@@ -86,6 +87,10 @@ function newGame()
 {
   board = Array.from({ length: ROWS }, () => Array(COLS).fill(EMPTY));
   
+  // Identificador da partida: o servidor mantém a tabela de transposição
+  // da engine entre as jogadas da mesma partida
+  gameId = Date.now().toString(36) + Math.random().toString(36).slice(2, 8);
+  
   LoadPlayers();
   
   turn = 1;
@@ -279,7 +284,7 @@ async function makeAIMove()
 
   console.log(`Calling AI API with board=${boardStr}, player=${player}, turn=${turn}, max_time_ms=${maxTimeMs}, max_depth=${maxDepth}`);
 
-  const url = `${API}/ai_move?board=${encodeURIComponent(boardStr)}&player=${encodeURIComponent(player)}&turn=${encodeURIComponent(turn)}&max_time_ms=${encodeURIComponent(maxTimeMs)}&max_depth=${encodeURIComponent(maxDepth)}`;
+  const url = `${API}/ai_move?board=${encodeURIComponent(boardStr)}&player=${encodeURIComponent(player)}&turn=${encodeURIComponent(turn)}&max_time_ms=${encodeURIComponent(maxTimeMs)}&max_depth=${encodeURIComponent(maxDepth)}&game_id=${encodeURIComponent(gameId)}`;
 
   try {
     const response = await fetch(url);
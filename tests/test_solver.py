@@ -0,0 +1,49 @@
+"""Resolvedor exato de finais dentro de choose_move."""
+import random
+import time
+
+import pytest
+
+import search
+from search import P1, ROWS, COLS, EMPTY, other
+
+# Folga para o tempo fora da busca (montagem da posição, tabela, PV)
+TOLERANCE_MS = 30
+
+def random_position(seed: int, plies: int):
+    """Posição não terminal após plies jogadas aleatórias."""
+    rng = random.Random(seed)
+    while True:
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+        turn = P1
+        for _ in range(plies):
+            board = search.make_move(board, rng.choice(search.valid_moves(board)), turn)
+            turn = other(turn)
+            if search.terminal(board)[0]:
+                break
+        else:
+            return board, turn
+
+# Posições com 8 peças em que o resolvedor não termina em 60 ms
+SLOW_SEEDS = [0, 1, 2, 4, 6, 7]
+
+@pytest.mark.parametrize("seed", SLOW_SEEDS)
+def test_solver_respects_time_budget(seed):
+    # Resolvedor habilitado para qualquer número de casas vazias: deve parar
+    # no prazo dele e deixar o restante para a busca heurística
+    board, turn = random_position(seed, 8)
+    config = {'max_time_ms': 60, 'max_depth': 42, 'book': None, 'solver_empty': ROWS * COLS}
+    start = time.perf_counter()
+    col, stats = search.search_with_stats(board, turn, config, verbose=False)
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    assert elapsed_ms <= config['max_time_ms'] + TOLERANCE_MS
+    assert stats.method == 'iterative_deepening'
+    assert stats.nodes > 0 and stats.depth_reached >= 1
+    assert col in search.valid_moves(board)
+
+def test_solver_exact_on_small_endgame():
+    board, turn = random_position(3, 32)
+    col, stats = search.search_with_stats(
+        board, turn, {'max_time_ms': 0, 'max_depth': 42, 'book': None}, verbose=False)
+    assert stats.method == 'solver'
+    assert col in search.valid_moves(board)
@@ -0,0 +1,70 @@
+"""Simetria espelhada (coluna c <-> 6-c): chaves, bitboards e choose_move."""
+import random
+
+import pytest
+
+import search
+from search import P1, P2, ROWS, COLS, EMPTY, other
+
+def random_positions(count: int, seed: int, max_plies: int = 30):
+    """Posições não terminais e não simétricas de partidas aleatórias."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+        turn = P1
+        for _ in range(rng.randint(1, max_plies)):
+            board = search.make_move(board, rng.choice(search.valid_moves(board)), turn)
+            turn = other(turn)
+            if search.terminal(board)[0]:
+                break
+        else:
+            if search.mirror_board(board) != board:
+                positions.append((board, turn))
+    return positions
+
+def test_canonical_key_and_mirror_bits_during_play():
+    rng = random.Random(15)
+    for _ in range(50):
+        pos = search.Position()
+        turn = P1
+        while pos.valid_moves() and not pos.terminal()[0]:
+            pos.play(rng.choice(pos.valid_moves()), turn)
+            turn = other(turn)
+            key = pos.key()
+            mirrored_key = search.mirror_key(key)
+            assert pos.canonical_key() == (min(key, mirrored_key), mirrored_key < key)
+            flipped = search.Position.from_board(search.mirror_board(pos.grid))
+            assert flipped.key() == mirrored_key
+            assert pos.mirror_bits[P1] == flipped.bits[P1]
+            assert pos.mirror_bits[P2] == flipped.bits[P2]
+            assert flipped.canonical_key()[0] == pos.canonical_key()[0]
+
+def test_mirror_bits_after_undo():
+    rng = random.Random(16)
+    pos = search.Position()
+    turn = P1
+    for _ in range(12):
+        pos.play(rng.choice(pos.valid_moves()), turn)
+        turn = other(turn)
+    bits, mirror_bits = list(pos.bits), list(pos.mirror_bits)
+    for col in pos.valid_moves():
+        pos.play(col, turn)
+        pos.undo(col, turn)
+        assert list(pos.bits) == bits and list(pos.mirror_bits) == mirror_bits
+
+# Posições com até 4 peças (dentro do livro) e de meio-jogo
+POSITIONS = random_positions(6, 15, max_plies=4) + random_positions(10, 16)
+
+@pytest.mark.parametrize("algorithm", ["alphabeta", "pvs"])
+@pytest.mark.parametrize("book", [search.DEFAULT_BOOK_PATH, None])
+def test_mirrored_board_gives_mirrored_move_and_same_score(algorithm, book):
+    config = {'max_time_ms': 0, 'max_depth': 5, 'algorithm': algorithm, 'book': book}
+    for board, turn in POSITIONS:
+        col, stats = search.search_with_stats(board, turn, config, verbose=False)
+        mirrored_col, mirrored_stats = search.search_with_stats(
+            search.mirror_board(board), turn, config, verbose=False)
+        assert mirrored_col == COLS - 1 - col
+        assert mirrored_stats.method == stats.method
+        assert mirrored_stats.score == stats.score
+        assert mirrored_stats.pv == [COLS - 1 - c for c in stats.pv]